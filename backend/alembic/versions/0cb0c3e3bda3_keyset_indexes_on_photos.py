@@ -0,0 +1,29 @@
+"""keyset indexes on photos
+
+Revision ID: 0cb0c3e3bda3
+Revises: fc80718c1fd1
+Create Date: 2026-10-17 10:12:04.118532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0cb0c3e3bda3'
+down_revision: Union[str, None] = 'fc80718c1fd1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_photos_price_id', 'photos', ['price', 'id'])
+    op.create_index('ix_photos_created_at_id', 'photos', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_photos_created_at_id', table_name='photos')
+    op.drop_index('ix_photos_price_id', table_name='photos')
@@ -0,0 +1,27 @@
+"""photo renditions
+
+Revision ID: 1b7d5e3c9a48
+Revises: f41b8e2a6d90
+Create Date: 2026-10-17 15:26:10.381562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '1b7d5e3c9a48'
+down_revision: Union[str, None] = 'f41b8e2a6d90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('photos', sa.Column('renditions', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('photos', 'renditions')
@@ -0,0 +1,33 @@
+"""upload session ttl
+
+Revision ID: 2c6f8d1e4b73
+Revises: 7a9e2c4f1d65
+Create Date: 2026-10-17 17:05:12.118934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '2c6f8d1e4b73'
+down_revision: Union[str, None] = '7a9e2c4f1d65'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('upload_sessions', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.add_column('upload_sessions', sa.Column('last_activity_at', sa.DateTime(), nullable=True))
+    # istniejące sesje dostają pełny TTL od momentu migracji
+    op.execute("UPDATE upload_sessions SET created_at = UTC_TIMESTAMP(), last_activity_at = UTC_TIMESTAMP()")
+    op.create_index(op.f('ix_upload_sessions_last_activity_at'), 'upload_sessions', ['last_activity_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_upload_sessions_last_activity_at'), table_name='upload_sessions')
+    op.drop_column('upload_sessions', 'last_activity_at')
+    op.drop_column('upload_sessions', 'created_at')
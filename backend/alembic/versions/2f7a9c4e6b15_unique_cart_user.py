@@ -0,0 +1,49 @@
+"""unique cart user
+
+Revision ID: 2f7a9c4e6b15
+Revises: 5c9e3a7d1b48
+Create Date: 2026-10-18 12:14:37.508213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision: str = '2f7a9c4e6b15'
+down_revision: Union[str, None] = '5c9e3a7d1b48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # kilka koszyków jednego użytkownika – pozycje trafiają do najstarszego
+    conn = op.get_bind()
+    conn.execute(text("""
+        INSERT IGNORE INTO cart_items (cart_id, photo_id)
+        SELECT keep.id, ci.photo_id
+        FROM cart_items ci
+        JOIN cart c ON c.id = ci.cart_id
+        JOIN (SELECT user_id, MIN(id) AS id FROM cart GROUP BY user_id) keep
+          ON keep.user_id = c.user_id AND keep.id <> c.id
+    """))
+    conn.execute(text("""
+        DELETE ci FROM cart_items ci
+        JOIN cart c ON c.id = ci.cart_id
+        JOIN cart older ON older.user_id = c.user_id AND older.id < c.id
+    """))
+    conn.execute(text("""
+        DELETE c FROM cart c
+        JOIN cart older ON older.user_id = c.user_id AND older.id < c.id
+    """))
+    op.create_unique_constraint('uq_cart_user', 'cart', ['user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # klucz obcy user_id potrzebuje indeksu – zwykły przed usunięciem unikalnego
+    op.create_index('ix_cart_user_id', 'cart', ['user_id'])
+    op.drop_constraint('uq_cart_user', 'cart', type_='unique')
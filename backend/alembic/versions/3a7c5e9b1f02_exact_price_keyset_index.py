@@ -0,0 +1,33 @@
+"""exact price keyset index
+
+Revision ID: 3a7c5e9b1f02
+Revises: 6b1f4d8e3a27
+Create Date: 2026-10-18 09:41:17.305214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision: str = '3a7c5e9b1f02'
+down_revision: Union[str, None] = '6b1f4d8e3a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # keyset po cenie idzie po CAST(price AS DECIMAL(10, 2)) (price to FLOAT) –
+    # indeks funkcyjny (MySQL 8.0.13+) na tym samym wyrażeniu zamiast (price, id)
+    op.create_index('ix_photos_price_exact_id', 'photos',
+                    [text('(CAST(price AS DECIMAL(10, 2)))'), 'id'])
+    op.drop_index('ix_photos_price_id', table_name='photos')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_photos_price_id', 'photos', ['price', 'id'])
+    op.drop_index('ix_photos_price_exact_id', table_name='photos')
@@ -0,0 +1,34 @@
+"""media jobs server time
+
+Revision ID: 5c9e3a7d1b48
+Revises: 8d4b2f6a9c13
+Create Date: 2026-10-18 10:52:06.913457
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5c9e3a7d1b48'
+down_revision: Union[str, None] = '8d4b2f6a9c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # run_after/created_at z zegara bazy – worker porównuje je z NOW()
+    op.alter_column('media_jobs', 'run_after', existing_type=sa.DateTime(),
+                    existing_nullable=False, server_default=sa.text('CURRENT_TIMESTAMP'))
+    op.alter_column('media_jobs', 'created_at', existing_type=sa.DateTime(),
+                    existing_nullable=True, server_default=sa.text('CURRENT_TIMESTAMP'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('media_jobs', 'created_at', existing_type=sa.DateTime(),
+                    existing_nullable=True, server_default=None)
+    op.alter_column('media_jobs', 'run_after', existing_type=sa.DateTime(),
+                    existing_nullable=False, server_default=None)
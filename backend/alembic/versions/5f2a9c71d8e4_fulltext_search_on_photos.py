@@ -0,0 +1,39 @@
+"""fulltext search on photos
+
+Revision ID: 5f2a9c71d8e4
+Revises: 0cb0c3e3bda3
+Create Date: 2026-10-17 11:02:47.530914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+from app.utils.search import search_text_sql
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2a9c71d8e4'
+down_revision: Union[str, None] = '0cb0c3e3bda3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+    # kolumna generowana – zawsze zgodna z title/description, także dla CALL add_photo
+    conn.execute(text(
+        f"ALTER TABLE photos ADD COLUMN search_text TEXT "
+        f"GENERATED ALWAYS AS ({search_text_sql()}) STORED"
+    ))
+    conn.execute(text(
+        "CREATE FULLTEXT INDEX ft_photos_search_text ON photos (search_text)"
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ft_photos_search_text', table_name='photos')
+    op.drop_column('photos', 'search_text')
@@ -0,0 +1,35 @@
+"""unique cart item
+
+Revision ID: 6b1f4d8e3a27
+Revises: 4e8a1c7b2d59
+Create Date: 2026-10-17 21:58:44.120936
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision: str = '6b1f4d8e3a27'
+down_revision: Union[str, None] = '4e8a1c7b2d59'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # duplikaty z czasów bez ograniczenia – zostaje najstarsza pozycja
+    conn = op.get_bind()
+    conn.execute(text("""
+        DELETE ci FROM cart_items ci
+        JOIN cart_items older
+          ON older.cart_id = ci.cart_id AND older.photo_id = ci.photo_id AND older.id < ci.id
+    """))
+    op.create_unique_constraint('uq_cart_items_cart_photo', 'cart_items', ['cart_id', 'photo_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_cart_items_cart_photo', 'cart_items', type_='unique')
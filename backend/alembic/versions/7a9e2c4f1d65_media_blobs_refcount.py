@@ -0,0 +1,37 @@
+"""media blobs refcount
+
+Revision ID: 7a9e2c4f1d65
+Revises: 1b7d5e3c9a48
+Create Date: 2026-10-17 16:12:44.720195
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '7a9e2c4f1d65'
+down_revision: Union[str, None] = '1b7d5e3c9a48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # istniejące pliki (nazwy uuid) nie dostają wierszy – release_blob traktuje je jak refcount = 1
+    op.create_table(
+        'media_blobs',
+        sa.Column('content_key', sa.String(length=64), nullable=False),
+        sa.Column('file_path', sa.String(length=255), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=True),
+        sa.Column('refcount', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('content_key'),
+        sa.UniqueConstraint('file_path'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('media_blobs')
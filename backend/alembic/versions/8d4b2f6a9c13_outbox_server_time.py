@@ -0,0 +1,34 @@
+"""outbox server time
+
+Revision ID: 8d4b2f6a9c13
+Revises: 3a7c5e9b1f02
+Create Date: 2026-10-18 10:27:52.648190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4b2f6a9c13'
+down_revision: Union[str, None] = '3a7c5e9b1f02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # run_after/created_at z zegara bazy – sender porównuje je z NOW()
+    op.alter_column('email_outbox', 'run_after', existing_type=sa.DateTime(),
+                    existing_nullable=False, server_default=sa.text('CURRENT_TIMESTAMP'))
+    op.alter_column('email_outbox', 'created_at', existing_type=sa.DateTime(),
+                    existing_nullable=True, server_default=sa.text('CURRENT_TIMESTAMP'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('email_outbox', 'created_at', existing_type=sa.DateTime(),
+                    existing_nullable=True, server_default=None)
+    op.alter_column('email_outbox', 'run_after', existing_type=sa.DateTime(),
+                    existing_nullable=False, server_default=None)
@@ -0,0 +1,28 @@
+"""photo hls playlist
+
+Revision ID: 9d3b5f7a2e18
+Revises: 2c6f8d1e4b73
+Create Date: 2026-10-17 17:41:37.502816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3b5f7a2e18'
+down_revision: Union[str, None] = '2c6f8d1e4b73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # starsze wideo: python -m app.manage enqueue-hls
+    op.add_column('photos', sa.Column('hls_playlist', sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('photos', 'hls_playlist')
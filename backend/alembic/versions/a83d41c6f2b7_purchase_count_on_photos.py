@@ -0,0 +1,43 @@
+"""purchase_count on photos
+
+Revision ID: a83d41c6f2b7
+Revises: 5f2a9c71d8e4
+Create Date: 2026-10-17 11:48:19.204113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision: str = 'a83d41c6f2b7'
+down_revision: Union[str, None] = '5f2a9c71d8e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "photos",
+        sa.Column("purchase_count", sa.Integer(), server_default="0", nullable=False)
+    )
+
+    # backfill istniejących zakupów (później: python -m app.manage reconcile-purchase-counts)
+    conn = op.get_bind()
+    conn.execute(text("""
+        UPDATE photos p
+        JOIN (SELECT photo_id, COUNT(*) AS cnt FROM purchases GROUP BY photo_id) c
+          ON c.photo_id = p.id
+        SET p.purchase_count = c.cnt
+    """))
+
+    op.create_index('ix_photos_purchase_count_id', 'photos', ['purchase_count', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_photos_purchase_count_id', table_name='photos')
+    op.drop_column('photos', 'purchase_count')
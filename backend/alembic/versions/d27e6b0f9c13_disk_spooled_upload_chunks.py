@@ -0,0 +1,39 @@
+"""disk spooled upload chunks
+
+Revision ID: d27e6b0f9c13
+Revises: a83d41c6f2b7
+Create Date: 2026-10-17 13:20:51.664208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd27e6b0f9c13'
+down_revision: Union[str, None] = 'a83d41c6f2b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('upload_sessions', sa.Column('chunk_size', sa.Integer(), server_default=str(1024 * 1024), nullable=False))
+    op.add_column('upload_sessions', sa.Column('total_size', sa.BigInteger(), nullable=True))
+    op.add_column('upload_sessions', sa.Column('spool_path', sa.String(length=255), nullable=True))
+    op.create_table(
+        'upload_chunks',
+        sa.Column('upload_session_id', sa.Integer(), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['upload_session_id'], ['upload_sessions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('upload_session_id', 'chunk_index'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('upload_chunks')
+    op.drop_column('upload_sessions', 'spool_path')
+    op.drop_column('upload_sessions', 'total_size')
+    op.drop_column('upload_sessions', 'chunk_size')
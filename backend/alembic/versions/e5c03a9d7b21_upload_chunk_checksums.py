@@ -0,0 +1,27 @@
+"""upload chunk checksums
+
+Revision ID: e5c03a9d7b21
+Revises: d27e6b0f9c13
+Create Date: 2026-10-17 13:58:06.417720
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c03a9d7b21'
+down_revision: Union[str, None] = 'd27e6b0f9c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('upload_chunks', sa.Column('checksum', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('upload_chunks', 'checksum')
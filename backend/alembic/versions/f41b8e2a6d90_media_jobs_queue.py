@@ -0,0 +1,47 @@
+"""media jobs queue
+
+Revision ID: f41b8e2a6d90
+Revises: e5c03a9d7b21
+Create Date: 2026-10-17 14:41:33.902715
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f41b8e2a6d90'
+down_revision: Union[str, None] = 'e5c03a9d7b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('photos', sa.Column('media_status', sa.String(length=20), server_default='ready', nullable=False))
+    op.create_table(
+        'media_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('photo_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(length=1024), nullable=True),
+        sa.Column('run_after', sa.DateTime(), nullable=False),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['photo_id'], ['photos.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_media_jobs_id', 'media_jobs', ['id'])
+    op.create_index('ix_media_jobs_status_run_after', 'media_jobs', ['status', 'run_after'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_media_jobs_status_run_after', table_name='media_jobs')
+    op.drop_index('ix_media_jobs_id', table_name='media_jobs')
+    op.drop_table('media_jobs')
+    op.drop_column('photos', 'media_status')
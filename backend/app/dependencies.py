@@ -2,11 +2,13 @@
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.security import verify_token
 from app.database import SessionLocal
 from app.models import User
+from app.utils.cache import Principal, principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
 """
@@ -37,12 +39,23 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         )
     return int(user_id)
 
-def check_admin(
-    current_user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+def load_principal(user_id: int) -> Principal | None:
+    """Jeden SELECT po id; własna sesja, bo przy trafieniu w cache bazy nie ma wcale."""
+    db = SessionLocal()
+    try:
+        row = db.execute(
+            select(User.id, User.role, User.banned, User.full_banned).where(User.id == user_id)
+        ).first()
+    finally:
+        db.close()
+    if row is None:
+        return None
+    return Principal(id=row.id, role=row.role, banned=bool(row.banned), full_banned=bool(row.full_banned))
+
+
+def check_admin(current_user_id: int = Depends(get_current_user)) -> Principal:
     """Sprawdza, czy zalogowany użytkownik ma rolę 'admin'."""
-    user = db.query(User).filter(User.id == current_user_id).first()
+    user = principal_cache.get(current_user_id, load_principal)
     if not user or user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -50,12 +63,11 @@ def check_admin(
         )
     return user
 
-def ensure_not_banned(
-    current_user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    user = db.query(User).filter(User.id == current_user_id).first()
-    if user and user.banned:
+def ensure_not_banned(current_user_id: int = Depends(get_current_user)) -> int:
+    user = principal_cache.get(current_user_id, load_principal)
+    if user is None:
+        raise HTTPException(status_code=404, detail="Użytkownik nie istnieje")
+    if user.banned:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Konto jest zablokowane"
@@ -79,17 +79,10 @@ def create_sql_objects():
         END
         """))
 
-        # 5. Trigger: po zakupie czyści koszyk
-        conn.execute(text("""
-        CREATE TRIGGER IF NOT EXISTS clear_cart_after_purchase
-        AFTER INSERT ON purchases
-        FOR EACH ROW
-        BEGIN
-            DECLARE cartId INT;
-            SELECT id INTO cartId FROM cart WHERE user_id = NEW.user_id LIMIT 1;
-            DELETE FROM cart_items WHERE cart_id = cartId;
-        END
-        """))
+        # 5. (usunięty) trigger czyszczący koszyk po każdym INSERT do purchases –
+        #    checkout (utils/checkout.py) czyści koszyk jednym DELETE, a trigger
+        #    blokowałby INSERT ... SELECT FROM cart_items (MySQL, błąd 1442)
+        conn.execute(text("DROP TRIGGER IF EXISTS clear_cart_after_purchase"))
 
         # 6. Trigger: logowanie płatności przy usunięciu zakupów
         conn.execute(text("""
@@ -245,4 +238,67 @@ def create_sql_objects():
             RETURN result;
         END
         """))
-        
\ No newline at end of file
+        
+        # 14. Licznik zakupów w photos.purchase_count: INSERT podbija checkout
+        #     (utils/checkout.py – jeden UPDATE ... JOIN, trigger AFTER INSERT dałby
+        #     błąd 1442 przy INSERT ... SELECT JOIN photos), DELETE – trigger
+        conn.execute(text("DROP TRIGGER IF EXISTS trg_purchase_count_after_insert"))
+        conn.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS trg_purchase_count_after_delete
+        AFTER DELETE ON purchases
+        FOR EACH ROW
+        BEGIN
+            UPDATE photos SET purchase_count = GREATEST(purchase_count - 1, 0) WHERE id = OLD.photo_id;
+        END
+        """))
+
+        # 15. Procedura: uzgodnienie purchase_count z tabelą purchases dla zakresu id
+        conn.execute(text("""
+        CREATE PROCEDURE IF NOT EXISTS reconcile_purchase_counts(IN from_id INT, IN to_id INT)
+        BEGIN
+            UPDATE photos p
+            LEFT JOIN (
+                SELECT photo_id, COUNT(*) AS cnt
+                FROM purchases
+                WHERE photo_id BETWEEN from_id AND to_id
+                GROUP BY photo_id
+            ) c ON c.photo_id = p.id
+            SET p.purchase_count = COALESCE(c.cnt, 0)
+            WHERE p.id BETWEEN from_id AND to_id
+              AND p.purchase_count <> COALESCE(c.cnt, 0);
+            SELECT ROW_COUNT() AS fixed;
+        END
+        """))
+
+        # 16. Procedura: dodanie do koszyka w jednym wywołaniu (walidacja + INSERT);
+        #     duplikat wykrywa uq_cart_items_cart_photo. Zwraca wynik jako tekst.
+        #     Koszyk (jeden na użytkownika – uq_cart_user) blokowany FOR UPDATE jak
+        #     w POST /cart/add. DROP – baza z poprzednią wersją dostaje nową treść.
+        conn.execute(text("DROP PROCEDURE IF EXISTS cart_add_photo"))
+        conn.execute(text("""
+        CREATE PROCEDURE IF NOT EXISTS cart_add_photo(IN uid INT, IN pid INT)
+        BEGIN
+            DECLARE found INT;
+            DECLARE ownerId INT;
+            DECLARE cartId INT;
+            DECLARE outcome VARCHAR(20) DEFAULT 'added';
+            DECLARE CONTINUE HANDLER FOR 1062 SET outcome = 'in_cart';
+
+            SELECT COUNT(*), MAX(owner_id) INTO found, ownerId FROM photos WHERE id = pid;
+            IF EXISTS (SELECT 1 FROM purchases WHERE user_id = uid AND photo_id = pid) THEN
+                SET outcome = 'purchased';
+            ELSEIF found = 0 THEN
+                SET outcome = 'missing';
+            ELSEIF ownerId = uid THEN
+                SET outcome = 'own';
+            ELSE
+                SELECT id INTO cartId FROM cart WHERE user_id = uid FOR UPDATE;
+                IF cartId IS NULL THEN
+                    INSERT IGNORE INTO cart (user_id) VALUES (uid);
+                    SELECT id INTO cartId FROM cart WHERE user_id = uid FOR UPDATE;
+                END IF;
+                INSERT INTO cart_items (cart_id, photo_id) VALUES (cartId, pid);
+            END IF;
+            SELECT outcome;
+        END
+        """))
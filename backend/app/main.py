@@ -1,21 +1,37 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app import models
-from app.database import engine, Base
-from app.routers import users, photos, users, cart, payments
+from app.database import engine, Base, SessionLocal
+from app.routers import users, photos, users, cart, payments, media
 from app.routers.upload_router import router as upload_router
 from app.init_sql import create_sql_objects
-from fastapi.staticfiles import StaticFiles
-from pathlib import Path
+from app.utils.media_paths import MEDIA_DIR, MediaStaticFiles
+from app.utils import upload_gc, passwords, mailer
 
 Base.metadata.create_all(bind=engine)
 Base.metadata.create_all(bind=engine)
 create_sql_objects()
 
-app = FastAPI()
 
-MEDIA_DIR = Path("media")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # zadania w tle na czas życia procesu
+    sweeper = asyncio.create_task(upload_gc.run_sweeper(SessionLocal))
+    email_sender = asyncio.create_task(mailer.run_sender(SessionLocal))
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        email_sender.cancel()
+        passwords.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
 MEDIA_DIR.mkdir(exist_ok=True) 
 
 # ─── ROUTERS ──────────────────────────────────────────────
@@ -27,6 +43,8 @@ app.include_router(photos.router,  tags=["Photos"])
 app.include_router(users.router)
 app.include_router(cart.router, prefix="/cart", tags=["Cart"])
 app.include_router(payments.router)
+# /media/signed/... – przed montowaniem statycznego /media
+app.include_router(media.router)
 
 # ↘  upload_router też ma prefix="/photos" w definicji
 
@@ -45,6 +63,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -52,4 +71,4 @@ app.add_middleware(
 @app.get("/")
 def root():
     return {"message": "Witaj w FotoBank API!"}
-app.mount("/media", StaticFiles(directory="media"), name="media")
\ No newline at end of file
+app.mount("/media", MediaStaticFiles(directory="media"), name="media")
\ No newline at end of file
@@ -0,0 +1,178 @@
+# app/manage.py
+"""
+Polecenia administracyjne uruchamiane z katalogu backend:
+    python -m app.manage <polecenie> [opcje]
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from sqlalchemy import text, func
+
+from app import models
+from app.database import SessionLocal
+from app.utils import media_paths
+from app.utils.jobs import enqueue_media_jobs
+from app.utils.thumbnails import VIDEO_SUFFIXES
+
+
+# ----------------------------- PURCHASE COUNT -----------------------------
+def reconcile_purchase_counts(batch_size: int) -> None:
+    """Uzgadnia photos.purchase_count z tabelą purchases, partiami po id."""
+    db = SessionLocal()
+    try:
+        max_id = db.query(func.max(models.Photo.id)).scalar() or 0
+        fixed = 0
+        for start in range(1, max_id + 1, batch_size):
+            end = start + batch_size - 1
+            result = db.execute(
+                text("CALL reconcile_purchase_counts(:from_id, :to_id)"),
+                {"from_id": start, "to_id": end},
+            )
+            fixed += result.scalar() or 0
+            result.close()
+            db.commit()
+        print(f"[reconcile] poprawiono liczniki dla {fixed} zdjęć (max id {max_id})")
+    finally:
+        db.close()
+
+
+# ------------------------------ SHARD MEDIA -------------------------------
+def _move(src: Path, dst: Path) -> None:
+    """Przenosi plik/katalog; powtórzone po przerwaniu nic nie psuje."""
+    if not src.exists() or (src.is_dir() and dst.exists()):
+        return                      # już przeniesiony (albo nigdy nie istniał)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(src, dst)
+
+
+def _shard_file_group(old_path: str) -> int:
+    """
+    Przenosi jeden oryginał (wraz z miniaturą i renditions) i poprawia
+    wszystkie wiersze, które go wskazują (przy deduplikacji może być ich
+    kilka). Najpierw pliki, potem baza – w międzyczasie media_paths.resolve
+    znajduje plik pod nową ścieżką, więc przerwanie migracji jest bezpieczne.
+    """
+    db = SessionLocal()
+    try:
+        stem = Path(old_path).stem
+        new_path = media_paths.sharded(old_path)
+        _move(Path(old_path), new_path)
+
+        rows = db.execute(text("SELECT id, thumb_path, renditions FROM photos WHERE file_path = :old"),
+                          {"old": old_path}).mappings().all()
+        old_renditions = media_paths.RENDITIONS_DIR / stem
+        new_renditions = media_paths.renditions_dir(stem)
+        _move(old_renditions, new_renditions)
+
+        for row in rows:
+            new_thumb = None
+            if row["thumb_path"]:
+                new_thumb = media_paths.sharded(row["thumb_path"])
+                _move(Path(row["thumb_path"]), new_thumb)
+
+            renditions = row["renditions"]
+            if isinstance(renditions, str):
+                renditions = json.loads(renditions)
+            for r in renditions or []:
+                r["path"] = media_paths.sharded(r["path"]).as_posix()
+
+            db.execute(text("""
+                UPDATE photos SET file_path = :new, thumb_path = :thumb, renditions = :r
+                WHERE id = :id
+            """), {"new": str(new_path), "thumb": str(new_thumb) if new_thumb else None,
+                   "r": json.dumps(renditions) if renditions is not None else None, "id": row["id"]})
+
+        db.execute(text("UPDATE media_blobs SET file_path = :new WHERE file_path = :old"),
+                   {"new": str(new_path), "old": old_path})
+        db.commit()
+        return len(rows)
+    finally:
+        db.close()
+
+
+def shard_media(workers: int, batch_size: int) -> None:
+    """
+    Przenosi płaski układ media/ do media/ab/cd/ i przepisuje
+    file_path/thumb_path/renditions. Można przerwać i uruchomić ponownie –
+    zdjęcia już przeniesione są pomijane.
+    """
+    db = SessionLocal()
+    last_id, moved_files, moved_rows = 0, 0, 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                rows = db.execute(text("""
+                    SELECT id, file_path FROM photos
+                    WHERE id > :last AND file_path IS NOT NULL
+                    ORDER BY id LIMIT :limit
+                """), {"last": last_id, "limit": batch_size}).all()
+                db.rollback()           # nie trzymamy snapshotu między partiami
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                # jedna grupa = jeden plik na dysku; grupy są rozłączne, więc
+                # wątki nie przenoszą tego samego pliku
+                pending = sorted({r.file_path for r in rows if not media_paths.is_sharded(r.file_path)})
+                for count in pool.map(_shard_file_group, pending):
+                    moved_files += 1
+                    moved_rows += count
+                print(f"[shard-media] do id {last_id}: {moved_files} plików, {moved_rows} zdjęć")
+        print(f"[shard-media] gotowe: {moved_files} plików, {moved_rows} zdjęć")
+    finally:
+        db.close()
+
+
+# -------------------------------- HLS -----------------------------------
+def enqueue_hls(batch_size: int) -> None:
+    """Kolejkuje pakowanie HLS dla wideo wgranych przed jego wprowadzeniem."""
+    db = SessionLocal()
+    try:
+        last_id, queued = 0, 0
+        while True:
+            rows = db.execute(text("""
+                SELECT p.id, p.file_path FROM photos p
+                WHERE p.id > :last AND p.hls_playlist IS NULL AND p.file_path IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM media_jobs j WHERE j.photo_id = p.id AND j.kind = 'hls')
+                ORDER BY p.id LIMIT :limit
+            """), {"last": last_id, "limit": batch_size}).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            ids = [r.id for r in rows if Path(r.file_path).suffix.lower() in VIDEO_SUFFIXES]
+            enqueue_media_jobs(db, ids, kind="hls")
+            db.commit()
+            queued += len(ids)
+        print(f"[enqueue-hls] zakolejkowano {queued} wideo")
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("reconcile-purchase-counts", help="przelicz photos.purchase_count")
+    p.add_argument("--batch-size", type=int, default=10000)
+
+    p = sub.add_parser("shard-media", help="przenieś media/ do układu media/ab/cd/")
+    p.add_argument("--workers", type=int, default=8, help="równoległe wątki przenoszące pliki")
+    p.add_argument("--batch-size", type=int, default=1000)
+
+    p = sub.add_parser("enqueue-hls", help="zakolejkuj HLS dla starszych wideo")
+    p.add_argument("--batch-size", type=int, default=1000)
+
+    args = parser.parse_args()
+    if args.command == "reconcile-purchase-counts":
+        reconcile_purchase_counts(args.batch_size)
+    elif args.command == "shard-media":
+        shard_media(args.workers, args.batch_size)
+    elif args.command == "enqueue-hls":
+        enqueue_hls(args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
 # app/models.py
 from datetime import datetime
 from sqlalchemy import (
-    Column, Integer, String, Float, Boolean,
-    DateTime, ForeignKey, LargeBinary
+    Column, Integer, BigInteger, String, Float, Boolean,
+    DateTime, ForeignKey, LargeBinary, Index, Text, Computed, JSON, UniqueConstraint, text, func
 )
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.utils.search import search_text_sql
 
 
 # --------------------------- User ---------------------------
@@ -43,6 +44,16 @@ class Photo(Base):
     thumb_path  = Column(String(255))
     owner_id    = Column(Integer, ForeignKey("users.id"))
     created_at  = Column(DateTime, default=datetime.utcnow)
+    # tytuł + opis bez polskich znaków – pod indeks FULLTEXT
+    search_text = Column(Text, Computed(search_text_sql(), persisted=True))
+    # +1 w checkout_cart (utils/checkout.py), −1 triggerem AFTER DELETE na purchases (init_sql.py)
+    purchase_count = Column(Integer, default=0, server_default="0", nullable=False)
+    # pending → miniatury w kolejce media_jobs, ready / failed po przetworzeniu
+    media_status = Column(String(20), default="ready", server_default="ready", nullable=False)
+    # [{"width", "height", "format", "path"}, ...] – zapisuje worker (utils/renditions.py)
+    renditions = Column(JSON)
+    # media/hls/ab/cd/<nazwa>/master.m3u8 – tylko wideo, zapisuje worker (utils/hls.py)
+    hls_playlist = Column(String(255))
 
     # relacje
     owner      = relationship("User", back_populates="photos")
@@ -54,6 +65,15 @@ class Photo(Base):
         backref="photos"
     )
 
+    # indeksy pod stronicowanie keyset (sortowanie + id jako rozstrzygnięcie);
+    # cena jako dokładny DECIMAL – to samo wyrażenie co PRICE_KEY w routers/photos.py
+    __table_args__ = (
+        Index("ix_photos_price_exact_id", text("(CAST(price AS DECIMAL(10, 2)))"), "id"),
+        Index("ix_photos_created_at_id", "created_at", "id"),
+        Index("ix_photos_purchase_count_id", "purchase_count", "id"),
+        Index("ft_photos_search_text", "search_text", mysql_prefix="FULLTEXT"),
+    )
+
 
 
 # --------------------------- Purchase -----------------------
@@ -89,6 +109,9 @@ class PhotoCategory(Base):
 
 class Cart(Base):
     __tablename__ = "cart"
+    __table_args__ = (
+        UniqueConstraint("user_id", name="uq_cart_user"),     # jeden koszyk na użytkownika
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
 
@@ -105,6 +128,11 @@ class CartItem(Base):
     cart = relationship("Cart", back_populates="items")
     photo = relationship("Photo")
 
+    __table_args__ = (
+        # add_to_cart: duplikat = naruszenie klucza, bez osobnego SELECT
+        UniqueConstraint("cart_id", "photo_id", name="uq_cart_items_cart_photo"),
+    )
+
 # --------------------------- UploadSession -----------------------
 
 class UploadSession(Base):
@@ -115,6 +143,22 @@ class UploadSession(Base):
     total_chunks = Column(Integer, nullable=False)
     received_chunks = Column(Integer, default=0)
     is_finished = Column(Boolean, default=False)
+    chunk_size = Column(Integer, nullable=False, default=1024 * 1024, server_default=str(1024 * 1024))
+    total_size = Column(BigInteger, nullable=True)
+    spool_path = Column(String(255))        # plik roboczy w media_spool/
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # TTL liczony od ostatniego kawałka – wygasłe sesje sprząta utils/upload_gc.py
+    last_activity_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    chunks = relationship("UploadChunk", cascade="all, delete-orphan", passive_deletes=True)
+
+
+class UploadChunk(Base):
+    """Odebrany kawałek sesji – jeden wiersz na indeks (ponowne wysłanie nic nie psuje)."""
+    __tablename__ = "upload_chunks"
+    upload_session_id = Column(Integer, ForeignKey("upload_sessions.id", ondelete="CASCADE"), primary_key=True)
+    chunk_index = Column(Integer, primary_key=True)
+    checksum = Column(String(64))           # sha256 (hex) zapisanych danych
 
 # --------------------------- Order -----------------------
 class Order(Base):
@@ -157,6 +201,64 @@ class Payment(Base):
     order = relationship("Order", back_populates="payment")
 
 
+# --------------------------- MediaBlob -----------------------
+class MediaBlob(Base):
+    """Plik oryginału współdzielony przez zdjęcia o identycznej treści (utils/media_store.py)."""
+    __tablename__ = "media_blobs"
+
+    content_key = Column(String(64), primary_key=True)      # sha256 zawartości
+    file_path   = Column(String(255), unique=True, nullable=False)
+    size        = Column(BigInteger)
+    refcount    = Column(Integer, nullable=False, default=0)
+    created_at  = Column(DateTime, default=datetime.utcnow)
+
+
+# --------------------------- MediaJob -----------------------
+class MediaJob(Base):
+    """Zadanie w tle (miniatury itp.) – kolejka opróżniana przez app.worker."""
+    __tablename__ = "media_jobs"
+
+    id           = Column(Integer, primary_key=True, index=True)
+    photo_id     = Column(Integer, ForeignKey("photos.id", ondelete="CASCADE"), nullable=False)
+    kind         = Column(String(50), nullable=False, default="thumbnail")
+    status       = Column(String(20), nullable=False, default="pending")  # pending / running / failed
+    attempts     = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    last_error   = Column(String(1024))
+    # czas z zegara bazy (NOW()) – worker porównuje run_after z NOW()
+    run_after    = Column(DateTime, nullable=False, server_default=func.now())
+    locked_at    = Column(DateTime)
+    created_at   = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_media_jobs_status_run_after", "status", "run_after"),
+    )
+
+
+# --------------------------- EmailOutbox -----------------------
+class EmailOutbox(Base):
+    """Wiadomość do wysłania – kolejka opróżniana przez app.utils.mailer."""
+    __tablename__ = "email_outbox"
+
+    id           = Column(Integer, primary_key=True, index=True)
+    to_email     = Column(String(255), nullable=False)
+    subject      = Column(String(255), nullable=False)
+    body         = Column(Text, nullable=False)
+    status       = Column(String(20), nullable=False, default="pending")  # pending / sending / sent / failed
+    attempts     = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=8)
+    last_error   = Column(String(1024))
+    # czas zawsze z zegara bazy (NOW()) – claim_batch i backoff porównują z NOW()
+    run_after    = Column(DateTime, nullable=False, server_default=func.now())
+    locked_at    = Column(DateTime)
+    created_at   = Column(DateTime, server_default=func.now())
+    sent_at      = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_run_after", "status", "run_after"),
+    )
+
+
 # --------------------------- PurchaseLog -----------------------
 class PurchaseLog(Base):
     __tablename__ = "purchase_logs"
@@ -1,67 +1,123 @@
 # app/routers/cart.py
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Body
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
 from app.database import get_db
 from app.dependencies import get_current_user
 from app import models
+from app.utils.cache import catalog_cache
+from app.utils.checkout import lock_cart, checkout_cart
+from app.routers.photos import load_photo_details
 
 router = APIRouter()
 
+MAX_BULK_ADD = 500
+
+# wynik procedury cart_add_photo / klasyfikacji w add_many_to_cart -> odpowiedź
+ADD_ERRORS = {
+    "purchased": (400, "To zdjęcie zostało już zakupione."),
+    "in_cart": (400, "To zdjęcie jest już w koszyku."),
+    "missing": (404, "Zdjęcie nie istnieje."),
+    "own": (403, "Nie możesz dodać własnego zdjęcia do koszyka."),
+}
+
+
 @router.post("/add/{photo_id}")
 def add_to_cart(photo_id: int, user_id: int = Depends(get_current_user), db: Session = Depends(get_db)):
-    cart = db.query(models.Cart).filter_by(user_id=user_id).first()
-    if not cart:
-        cart = models.Cart(user_id=user_id)
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
-
-    # Sprawdzamy, czy zdjęcie już zostało zakupione przez użytkownika
-    stmt_check = text("""
-        SELECT 1
-        FROM purchases
-        WHERE user_id = :user_id AND photo_id = :photo_id
-        LIMIT 1
-    """)
-    existing_purchase = db.execute(stmt_check, {"user_id": user_id, "photo_id": photo_id}).first()
-
-    if existing_purchase:
-        # Jeśli zdjęcie zostało już zakupione, zwróć błąd z odpowiednim komunikatem
-        raise HTTPException(status_code=400, detail="To zdjęcie zostało już zakupione.")
-
-    # Sprawdzamy, czy zdjęcie już jest w koszyku
-    stmt = text("SELECT 1 FROM cart_items WHERE cart_id = :cid AND photo_id = :pid LIMIT 1")
-    exists = db.execute(stmt, {"cid": cart.id, "pid": photo_id}).first()
-    if exists:
-        raise HTTPException(status_code=400, detail="To zdjęcie jest już w koszyku.")
-
-    photo = db.query(models.Photo).filter_by(id=photo_id).first()
-    if not photo:
-        raise HTTPException(status_code=404, detail="Zdjęcie nie istnieje.")
-    if photo.owner_id == user_id:
-        raise HTTPException(status_code=403, detail="Nie możesz dodać własnego zdjęcia do koszyka.")
-
-    item = models.CartItem(cart_id=cart.id, photo_id=photo_id)
-    db.add(item)
+    # walidacja + INSERT w jednym wywołaniu procedury (init_sql.py)
+    result = db.execute(text("CALL cart_add_photo(:uid, :pid)"), {"uid": user_id, "pid": photo_id})
+    outcome = result.scalar()
+    result.close()
     db.commit()
-    return {"message": "Dodano do koszyka"}
 
+    if outcome in ADD_ERRORS:
+        status_code, detail = ADD_ERRORS[outcome]
+        raise HTTPException(status_code=status_code, detail=detail)
+    return {"message": "Dodano do koszyka"}
 
 
+@router.post("/add")
+def add_many_to_cart(
+    photo_ids: List[int] = Body(..., embed=True),
+    user_id: int = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Wiele zdjęć naraz: jedno zapytanie sprawdzające wszystkie i jeden INSERT.
+    Koszyk jest blokowany (FOR UPDATE) przed sprawdzeniem – równoległe
+    dodania tego samego użytkownika (także procedura cart_add_photo) idą
+    po kolei, więc "added" to dokładnie wstawione wiersze.
+    """
+    photo_ids = list(dict.fromkeys(photo_ids))
+    if not photo_ids:
+        raise HTTPException(status_code=400, detail="Brak zdjęć do dodania.")
+    if len(photo_ids) > MAX_BULK_ADD:
+        raise HTTPException(status_code=400, detail=f"Najwyżej {MAX_BULK_ADD} zdjęć naraz.")
+
+    cart_id = lock_cart(db, user_id)
+    if cart_id is None:
+        # IGNORE – równoległe utworzenie koszyka kończy się na uq_cart_user
+        db.execute(text("INSERT IGNORE INTO cart (user_id) VALUES (:uid)"), {"uid": user_id})
+        cart_id = lock_cart(db, user_id)
+
+    rows = db.execute(text("""
+        SELECT p.id, p.owner_id,
+               EXISTS(SELECT 1 FROM purchases pu WHERE pu.user_id = :uid AND pu.photo_id = p.id) AS purchased,
+               EXISTS(SELECT 1 FROM cart_items ci WHERE ci.cart_id = :cid AND ci.photo_id = p.id) AS in_cart
+        FROM photos p
+        WHERE p.id IN :ids
+    """).bindparams(bindparam("ids", expanding=True)),
+        {"uid": user_id, "cid": cart_id, "ids": photo_ids}).all()
+
+    outcomes = {pid: "missing" for pid in photo_ids}
+    for r in rows:
+        if r.purchased:
+            outcomes[r.id] = "purchased"
+        elif r.in_cart:
+            outcomes[r.id] = "in_cart"
+        elif r.owner_id == user_id:
+            outcomes[r.id] = "own"
+        else:
+            outcomes[r.id] = "added"
+
+    added = [pid for pid, outcome in outcomes.items() if outcome == "added"]
+    if added:
+        # IGNORE – wiersz wstawiony z pominięciem blokady koszyka nie wywraca całości
+        inserted = db.execute(text("INSERT IGNORE INTO cart_items (cart_id, photo_id) VALUES (:cid, :pid)"),
+                              [{"cid": cart_id, "pid": pid} for pid in added]).rowcount
+        if inserted != len(added):
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Koszyk zmienił się w trakcie – spróbuj ponownie.")
+    db.commit()
 
-@router.get("/", response_model=list[int])
-def view_cart(user_id: int = Depends(get_current_user), db: Session = Depends(get_db)):
-    cart = db.query(models.Cart).filter_by(user_id=user_id).first()
-    if not cart:
-        return []
+    return {
+        "added": added,
+        "skipped": [
+            {"photo_id": pid, "detail": ADD_ERRORS[outcome][1]}
+            for pid, outcome in outcomes.items() if outcome != "added"
+        ],
+    }
+
+
+@router.get("/")
+def view_cart(
+    hydrated: bool = Query(default=False),
+    user_id: int = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Lista id zdjęć w koszyku; z hydrated=true – pełne dane zdjęć (jak /photos/batch)."""
     stmt = text("""
         SELECT ci.photo_id
         FROM cart c JOIN cart_items ci ON c.id = ci.cart_id
         WHERE c.user_id = :uid
     """)
     rows = db.execute(stmt, {"uid": user_id}).fetchall()
-    return [r[0] for r in rows]
+    photo_ids = [r[0] for r in rows]
+    if hydrated:
+        return load_photo_details(db, photo_ids)
+    return photo_ids
 
 
 @router.delete("/remove/{photo_id}")
@@ -124,33 +180,18 @@ def cart_item_count(user_id: int = Depends(get_current_user), db: Session = Depe
 
 @router.post("/add-to-purchased")
 def add_to_purchased(user_id: int = Depends(get_current_user), db: Session = Depends(get_db)):
-    cart = db.query(models.Cart).filter_by(user_id=user_id).first()
-    if not cart or not cart.items:
-        raise HTTPException(status_code=400, detail="Koszyk jest pusty.")
-
-    total = 0
     try:
-        for item in cart.items:
-            photo = item.photo
-            if not photo:
-                continue
-
-            stmt = text("""
-                INSERT INTO purchases (user_id, photo_id, purchase_date, payment_status, total_cost, created_at)
-                VALUES (:user_id, :photo_id, NOW(), 'completed', :total_cost, NOW())
-            """)
-            db.execute(stmt, {"user_id": user_id, "photo_id": photo.id, "total_cost": photo.price})
-
-            total += photo.price
-
-            stmt_delete = text("""
-                DELETE FROM cart_items WHERE cart_id = :cart_id AND photo_id = :photo_id
-            """)
-            db.execute(stmt_delete, {"cart_id": cart.id, "photo_id": photo.id})
-
+        cart_id = lock_cart(db, user_id)
+        count, total = checkout_cart(db, user_id, cart_id) if cart_id else (0, 0.0)
+        if not count:
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Koszyk jest pusty.")
         db.commit()
-        return {"message": f"Zdjęcia zostały przeniesione do zakupu. Kwota: {total:.2f} zł"}
-
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail="Błąd podczas przetwarzania zakupu: " + str(e))
+
+    catalog_cache.bump()
+    return {"message": f"Zdjęcia zostały przeniesione do zakupu. Kwota: {total:.2f} zł"}
@@ -0,0 +1,66 @@
+# app/routers/media.py
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.utils import media_paths, signed_urls
+from app.utils.file_serving import serve_file
+from app.utils.renditions import available_formats
+from app.utils.resize_cache import resize_cache, MAX_DIMENSION
+from app.utils.thumbnails import VIDEO_SUFFIXES
+
+router = APIRouter(prefix="/media", tags=["media"])
+
+
+@router.get("/signed/{rel_path:path}")
+def get_signed_file(
+    rel_path: str,
+    exp: int = Query(...),
+    sig: str = Query(...),
+    name: str = Query(default=""),
+):
+    # bez bazy i bez JWT – uprawnienia sprawdzono przy wydaniu adresu
+    if not signed_urls.verify(rel_path, exp, sig, name):
+        raise HTTPException(status_code=403, detail="Link wygasł lub jest nieprawidłowy")
+
+    path = media_paths.resolve((media_paths.MEDIA_DIR / rel_path).as_posix())
+    if path is None:
+        raise HTTPException(status_code=404, detail="Plik nie znaleziony na dysku")
+
+    # adres jest niezmienny do `exp` – może go trzymać przeglądarka i CDN
+    max_age = max(0, exp - int(time.time()))
+    return serve_file(path, filename=name or None, disposition="attachment" if name else "inline",
+                      cache_control=f"public, max-age={max_age}")
+
+
+@router.get("/resize/{photo_id}")
+def get_resized(
+    photo_id: int,
+    w: int | None = Query(default=None, ge=1, le=MAX_DIMENSION),
+    h: int | None = Query(default=None, ge=1, le=MAX_DIMENSION),
+    fmt: str = Query(default="jpeg"),
+    db: Session = Depends(get_db),
+):
+    """
+    Zdjęcie zmieszczone w w×h (bez powiększania), liczone przy pierwszym żądaniu.
+    w i h zaokrąglane są w górę do SIZE_BUCKETS (utils/resize_cache.py).
+    """
+    if w is None and h is None:
+        raise HTTPException(status_code=400, detail="Podaj w lub h")
+    if fmt not in available_formats():
+        raise HTTPException(status_code=400, detail=f"Nieobsługiwany format: {fmt}")
+
+    stored = db.execute(text("SELECT file_path FROM photos WHERE id = :id"), {"id": photo_id}).scalar()
+    db.close()      # render może potrwać – połączenie wraca do puli od razu
+    src = media_paths.resolve(stored)
+    if src is None:
+        raise HTTPException(status_code=404, detail="Plik nie znaleziony na dysku")
+    if src.suffix.lower() in VIDEO_SUFFIXES:
+        raise HTTPException(status_code=415, detail="Zmiana rozmiaru dostępna tylko dla zdjęć")
+
+    path = resize_cache.get_or_render(src, stored, w, h, fmt)
+    # treść pod tym adresem zmienia się tylko razem z oryginałem (ETag pilnuje reszty)
+    return serve_file(path, media_type=f"image/{fmt}", cache_control="public, max-age=86400")
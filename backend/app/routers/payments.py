@@ -5,6 +5,8 @@ from app.dependencies import get_current_user
 from paypalcheckoutsdk.orders import OrdersCreateRequest, OrdersCaptureRequest
 from app.paypal_client import paypal_client
 from app import models
+from app.utils.cache import catalog_cache
+from app.utils.checkout import lock_cart, checkout_cart
 import os
 from datetime import datetime, timedelta
 
@@ -62,38 +64,21 @@ def capture_order(order_id: str, user_id: int = Depends(get_current_user), db: S
     request.request_body({})
     response = paypal_client.execute(request)
 
-    cart = db.query(models.Cart).filter_by(user_id=user_id).first()
-    if not cart or not cart.items:
+    cart_id = lock_cart(db, user_id)
+    if not cart_id:
         raise HTTPException(400, "Koszyk pusty lub wygasł")
 
-    new_order = models.Order(
-        user_id=user_id,
-        status="completed",
-        created_at=datetime.utcnow() + timedelta(hours=2)
-    )
+    now = datetime.utcnow() + timedelta(hours=2)
+    new_order = models.Order(user_id=user_id, status="completed", created_at=now)
     db.add(new_order)
     db.flush()
 
-    total = 0
-
-    for item in cart.items:
-        db.add(models.OrderItem(
-            order_id=new_order.id,
-            photo_id=item.photo_id,
-            price=item.photo.price,
-            access_url=item.photo.file_path
-        ))
-        db.add(models.Purchase(
-            user_id=user_id,
-            photo_id=item.photo_id,
-            purchase_date=datetime.utcnow() + timedelta(hours=2),
-            payment_status="completed",
-            total_cost=item.photo.price,
-            created_at=datetime.utcnow() + timedelta(hours=2)
-        ))
-        total += item.photo.price
-
-    db.query(models.CartItem).filter_by(cart_id=cart.id).delete()
+    # order_items + purchases + czyszczenie koszyka – zbiorowo (utils/checkout.py)
+    count, _ = checkout_cart(db, user_id, cart_id, order_id=new_order.id, at=now)
+    if not count:
+        db.rollback()
+        raise HTTPException(400, "Koszyk pusty lub wygasł")
     db.commit()
+    catalog_cache.bump()
 
-    return {"message": "Płatność zakończona sukcesem", "order_id": new_order.id}
\ No newline at end of file
+    return {"message": "Płatność zakończona sukcesem", "order_id": new_order.id}
@@ -2,31 +2,48 @@
 
 from uuid import uuid4
 from pathlib import Path
+from datetime import datetime
+import asyncio
+import base64
+import json
+import os
 import shutil
 import mimetypes
 import subprocess
 from typing import List
 
 from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Form, Query, Body, Request
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, RedirectResponse
+from fastapi.concurrency import run_in_threadpool
 from starlette.staticfiles import StaticFiles
-from sqlalchemy.orm import Session, joinedload, aliased
-from sqlalchemy import or_, func, and_, text
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import or_, func, and_, text, bindparam, cast, Numeric, select
 
 from app.schemas import PhotoOut
 from app.models import UploadSession, Photo, User
 from app.database import SessionLocal, get_db
 from app.dependencies import get_current_user, check_admin
 from app import models, schemas
-from app.utils.thumbnails import create_video_thumb, create_image_thumb
+from app.utils.search import build_boolean_query, like_pattern
+from app.utils.cache import catalog_cache
+from app.utils import chunk_store
+from app.utils import media_store
+from app.utils import media_paths
+from app.utils import aio
+from app.utils import upload_gc
+from app.utils import signed_urls
+from app.utils.file_serving import serve_file
+from app.utils.zipstream import stream_zip, safe_name
+from app.utils.jobs import enqueue_media_jobs
+from app.utils.pagination import encode_cursor, decode_cursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.dependencies import check_admin
 from typing import List
 
 
 from sqlalchemy.orm import Session
 
-MEDIA_DIR: Path = Path("media")
-THUMBS_DIR: Path = MEDIA_DIR / "thumbs"
+MEDIA_DIR: Path = media_paths.MEDIA_DIR
+THUMBS_DIR: Path = media_paths.THUMBS_DIR
 MEDIA_DIR.mkdir(exist_ok=True)
 THUMBS_DIR.mkdir(exist_ok=True)
 
@@ -36,35 +53,6 @@ ALLOWED_TYPES: set[str] = IMAGE_TYPES | VIDEO_TYPES
 API_BASE = "http://127.0.0.1:8000"
 router = APIRouter()
 
-def create_thumbnail(src_path: Path, dst_path: Path) -> None:
-    try:
-        if src_path.suffix.lower() in {".jpg", ".jpeg", ".png"}:
-            from PIL import Image
-            with Image.open(src_path) as im:
-                # Konwersja do RGB (usuwa kanał alfa, jeśli jest)
-                if im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info):
-                    im = im.convert("RGB")
-
-                im.thumbnail((320, 320))
-                im.save(dst_path, format="JPEG", quality=85)
-        else:
-            # ... (pozostała obsługa wideo)
-            import subprocess
-            # (np. komenda ffmpeg)
-            command = [
-                "ffmpeg",
-                "-i",
-                str(src_path),
-                "-vf",
-                "thumbnail,scale=320:-1",
-                "-frames:v",
-                "1",
-                str(dst_path),
-            ]
-            subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    except Exception as e:
-        print(f"Błąd przy generowaniu miniatury: {e}")
-
 def get_db():
     db = SessionLocal()
     try:
@@ -72,9 +60,25 @@ def get_db():
     finally:
         db.close()
 
+def build_renditions(renditions) -> List[schemas.RenditionOut]:
+    # z surowego SELECT * kolumna JSON przychodzi jako tekst
+    if isinstance(renditions, str):
+        renditions = json.loads(renditions)
+    return [
+        schemas.RenditionOut(width=r["width"], height=r["height"], format=r["format"],
+                             url=f"{API_BASE}/{r['path']}")
+        for r in renditions or []
+    ]
+
 def build_photo_response(photo: models.Photo) -> schemas.PhotoOut:
-    file_name = Path(photo.file_path).name if photo.file_path else ""
-    thumb_name = f"{Path(file_name).stem}.jpg" if file_name else None
+    # ścieżki w bazie są względem backend/ (media/ab/cd/... albo jeszcze płaskie
+    # sprzed shard-media); adres płaski pliku już przeniesionego obsługuje
+    # fallback w MediaStaticFiles, więc bierzemy to, co zapisano
+    file_rel = Path(photo.file_path).as_posix() if photo.file_path else ""
+    if photo.thumb_path:
+        thumb_rel = Path(photo.thumb_path).as_posix()
+    else:
+        thumb_rel = (media_paths.THUMBS_DIR / f"{Path(file_rel).stem}.jpg").as_posix() if file_rel else None
     category_ids = [c.id for c in photo.categories]
 
     return schemas.PhotoOut(
@@ -84,10 +88,13 @@ def build_photo_response(photo: models.Photo) -> schemas.PhotoOut:
         category=",".join([c.name for c in photo.categories]),
         price=photo.price,
         owner_id=photo.owner_id,
-        file_url=f"{API_BASE}/media/{file_name}" if file_name else "",
-        thumb_url=f"{API_BASE}/media/thumbs/{thumb_name}" if thumb_name else None,
+        file_url=f"{API_BASE}/{file_rel}" if file_rel else "",
+        thumb_url=f"{API_BASE}/{thumb_rel}" if thumb_rel else None,
         category_ids=category_ids,
-        purchases_number=len(photo.purchases)
+        purchases_number=photo.purchase_count or 0,
+        media_status=photo.media_status or "ready",
+        renditions=build_renditions(photo.renditions),
+        hls_url=f"{API_BASE}/{photo.hls_playlist}" if photo.hls_playlist else None,
     )
 
 def add_photo_via_proc(db: Session, title, description, category, price, file_path, thumb_path, owner_id) -> int:
@@ -118,6 +125,60 @@ def get_user_photos(
     return [build_photo_response(Photo(**r)) for r in rows]
 
 
+def store_uploaded_batch(db: Session, accepted, written, titles, descriptions, price,
+                         category_ids, user_id) -> List[schemas.PhotoOut]:
+    """
+    Zapis wsadu w jednej transakcji: zapytania zbiorcze zamiast procedury
+    per plik, odpowiedź z danych w pamięci.
+    """
+    try:
+        blobs = media_store.acquire_blobs(db, [
+            (tmp_path, sha256, size, Path(f.filename).suffix.lower())
+            for (tmp_path, sha256, size), (_, f) in zip(written, accepted)
+        ])
+        categories = (
+            db.query(models.Category).filter(models.Category.id.in_(category_ids)).all()
+            if category_ids else []
+        )
+        # zegar bazy, jak NOW() w procedurze add_photo – jeden odczyt dla całego wsadu
+        now = db.scalar(select(func.now()))
+        photos = [
+            models.Photo(
+                title=titles[i],
+                description=descriptions[i],
+                category="",
+                price=price,
+                file_path=str(blob.file_path),
+                thumb_path=str(blob.thumb_path),
+                owner_id=user_id,
+                created_at=now,
+                purchase_count=0,
+                # miniatury: istniejące dla tej treści albo zadanie dla workera
+                media_status="ready" if blob.renditions is not None else "pending",
+                renditions=blob.renditions,
+                hls_playlist=blob.hls_playlist,
+                categories=list(categories),     # photo_categories: jeden executemany przy flush
+            )
+            for (i, _), blob in zip(accepted, blobs)
+        ]
+        db.add_all(photos)
+        db.flush()
+        pending = [(p, blob) for p, blob in zip(photos, blobs) if blob.renditions is None]
+        enqueue_media_jobs(db, [p.id for p, _ in pending])
+        enqueue_media_jobs(db, [p.id for p, blob in pending if blob.is_video], kind="hls")
+
+        # odpowiedź z danych w pamięci – bez ponownego SELECT
+        output = [build_photo_response(p) for p in photos]
+        db.commit()
+    except Exception:
+        db.rollback()
+        for tmp_path, _, _ in written:
+            tmp_path.unlink(missing_ok=True)        # te, których acquire_blobs nie zdążył przenieść
+        raise
+
+    return output
+
+
 @router.post("/upload", response_model=List[schemas.PhotoOut])
 async def upload_photos(
     request: Request,
@@ -132,90 +193,144 @@ async def upload_photos(
         raise HTTPException(400, "Liczba tytułów/opisów musi odpowiadać liczbie plików")
 
     form_data = await request.form()
-    output: List[schemas.PhotoOut] = []
-
-    for i, file in enumerate(files):
-        if file.content_type not in ALLOWED_TYPES:
-            continue
-
-        ext = Path(file.filename).suffix.lower()
-        file_name = f"{uuid4().hex}{ext}"
-        file_full_path = MEDIA_DIR / file_name
-
-        with file_full_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        thumb_full_path = THUMBS_DIR / f"{file_full_path.stem}.jpg"
-        create_thumbnail(file_full_path, thumb_full_path)
-
-        photo_id = add_photo_via_proc(
-            db,
-            title,
-            description,
-            category,
-            price,
-            str(file_path),
-            str(thumb_path) if thumb_path else None,
-            user_id
-        )
+    category_ids = [int(c) for c in form_data.getlist("category_ids")]
+    accepted = [(i, f) for i, f in enumerate(files) if f.content_type in ALLOWED_TYPES]
+    if not accepted:
+        return []
 
+    # 1. pliki na dysk równolegle (wątki, limit aio.MEDIA_IO_CONCURRENCY), sha256 w trakcie zapisu
+    written = await asyncio.gather(*(aio.save_upload(f) for _, f in accepted))
 
-        category_ids = form_data.getlist("category_ids")
-        for cat_id in category_ids:
-            db.add(models.PhotoCategory(photo_id=photo_id, category_id=int(cat_id)))
+    # 2. baza (synchroniczna sesja) – też poza pętlą zdarzeń
+    output = await run_in_threadpool(
+        store_uploaded_batch, db, accepted, written, titles, descriptions, price, category_ids, user_id
+    )
 
-        db.commit()
+    catalog_cache.bump()
+    return output
 
-        photo = db.query(models.Photo).filter(models.Photo.id == photo_id).first()
-        output.append(build_photo_response(photo))
 
-    return output
 
+# price to FLOAT (pojedyncza precyzja): 19.99 z kursora nie jest równe zapisanemu
+# 19.9899997…, więc remisy na granicy strony ginęłyby albo się powtarzały.
+# Klucz to dokładna wartość DECIMAL – w ORDER BY i w warunku kursora, pod nią
+# indeks funkcyjny ix_photos_price_exact_id.
+PRICE_KEY = cast(models.Photo.price, Numeric(10, 2))
+
+# kolumna klucza i kierunek dla każdego trybu sortowania (id rozstrzyga remisy)
+SORT_KEYS = {
+    "price_asc":  (PRICE_KEY, False),
+    "price_desc": (PRICE_KEY, True),
+    "date_new":   (models.Photo.created_at, True),
+    "popular":    (models.Photo.purchase_count, True),
+}
+
+
+def keyset_after(key, value, photo_id: int, descending: bool):
+    """Warunek „za kursorem” dla pary (klucz, id)."""
+    if descending:
+        return or_(key < value, and_(key == value, models.Photo.id < photo_id))
+    return or_(key > value, and_(key == value, models.Photo.id > photo_id))
+
+
+def photos_in_all_categories(db: Session, category_ids: List[int]):
+    """
+    Podzapytanie z id zdjęć należących do WSZYSTKICH podanych kategorii –
+    jeden przebieg po photo_categories zamiast jednego JOIN-a na kategorię.
+    """
+    wanted = set(category_ids)
+    return (
+        db.query(models.PhotoCategory.photo_id)
+        .filter(models.PhotoCategory.category_id.in_(wanted))
+        .group_by(models.PhotoCategory.photo_id)
+        .having(func.count(func.distinct(models.PhotoCategory.category_id)) == len(wanted))
+    )
 
 
 @router.get("/", response_model=List[schemas.PhotoOut])
 def list_photos(
+    request: Request,
     q: str = Query(default=None),
     category_ids: List[int] = Query(default=None, alias="category_ids"),
     sort_by: str = Query(default=None),
     price_min: float = Query(default=None),
     price_max: float = Query(default=None),
+    cursor: str = Query(default=None),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
 ):
+    """
+    Lista zdjęć stronicowana kursorem (keyset). Kursor kolejnej strony
+    zwracany jest w nagłówku X-Next-Cursor (brak nagłówka = ostatnia strona).
+    Przy wyszukiwaniu (q) bez sort_by wyniki są sortowane wg trafności.
+    """
+    cache_key = catalog_cache.key_for(request)
+    cached = catalog_cache.lookup(request, cache_key)
+    if cached:
+        return cached
+    version = catalog_cache.version
+
     query = db.query(models.Photo)
+    relevance = None
 
     if category_ids:
-        for i, cat_id in enumerate(category_ids):
-            alias = aliased(models.PhotoCategory, name=f"pc_{i}")
-            query = query.join(alias, alias.photo_id == models.Photo.id)
-            query = query.filter(alias.category_id == cat_id)
+        query = query.filter(models.Photo.id.in_(photos_in_all_categories(db, category_ids)))
     elif q:
-        query = query.filter(
-            or_(
-                models.Photo.title.ilike(f"%{q}%"),
-                models.Photo.description.ilike(f"%{q}%")
-            )
-        )
+        # indeks FULLTEXT na search_text (bez polskich znaków, małe litery)
+        boolean_q = build_boolean_query(q)
+        if boolean_q:
+            relevance = models.Photo.search_text.match(boolean_q)
+            query = query.filter(relevance)
+        else:
+            query = query.filter(models.Photo.search_text.like(like_pattern(q), escape="\\"))
 
     if price_min is not None:
         query = query.filter(models.Photo.price >= price_min)
     if price_max is not None:
         query = query.filter(models.Photo.price <= price_max)
 
-    if sort_by == "popular":
-        query = query.outerjoin(models.Purchase).group_by(models.Photo.id).order_by(func.count(models.Purchase.id).desc())
-    elif sort_by == "price_asc":
-        query = query.order_by(models.Photo.price.asc())
-    elif sort_by == "price_desc":
-        query = query.order_by(models.Photo.price.desc())
-    elif sort_by == "date_new":
-        query = query.order_by(models.Photo.created_at.desc())
+    if sort_by in SORT_KEYS:
+        mode = sort_by
+    else:
+        mode = "relevance" if relevance is not None else "id"
+
+    if mode == "relevance":
+        key, descending = relevance, True
+    elif mode == "id":
+        key, descending = None, False
+    else:
+        key, descending = SORT_KEYS[mode]
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, mode)
+        if key is None:
+            query = query.filter(models.Photo.id > last_id)
+        else:
+            query = query.filter(keyset_after(key, value, last_id, descending))
 
-    photos = query.options(
-        joinedload(models.Photo.categories),
-        joinedload(models.Photo.purchases)
-    ).all()
-    return [build_photo_response(p) for p in photos]
+    id_order = models.Photo.id.desc() if descending else models.Photo.id.asc()
+    if key is None:
+        query = query.order_by(id_order)
+    else:
+        query = query.add_columns(key.label("sort_key"))
+        query = query.order_by(key.desc() if descending else key.asc(), id_order)
+
+    rows = query.options(
+        selectinload(models.Photo.categories)
+    ).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    photos = [r if key is None else r[0] for r in rows]
+
+    headers = {}
+    if has_more:
+        last = rows[-1]
+        last_value = last.id if key is None else last.sort_key
+        headers["X-Next-Cursor"] = encode_cursor(mode, last_value, photos[-1].id)
+
+    payload = [build_photo_response(p) for p in photos]
+    return catalog_cache.store(cache_key, payload, headers, version, request)
 
 @router.get("/me", response_model=List[schemas.PhotoOut])
 def get_my_photos(user_id: int = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -225,10 +340,63 @@ def get_my_photos(user_id: int = Depends(get_current_user), db: Session = Depend
 
 
 @router.get("/categories", response_model=List[schemas.CategoryOut])
-def get_categories(db: Session = Depends(get_db)):
+def get_categories(request: Request, db: Session = Depends(get_db)):
+    cache_key = catalog_cache.key_for(request)
+    cached = catalog_cache.lookup(request, cache_key)
+    if cached:
+        return cached
+    version = catalog_cache.version
+
     categories = db.query(models.Category).all()
-    return [{"id": cat.id, "name": cat.name} for cat in categories]
+    payload = [{"id": cat.id, "name": cat.name} for cat in categories]
+    return catalog_cache.store(cache_key, payload, version=version, request=request)
+
+
+# ---------- ZIP z zakupionymi zdjęciami ----------
+
+@router.get("/purchased/zip")
+def download_purchased_zip(
+    ids: List[int] = Query(default=[]),
+    user_id: int = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Wszystkie zakupione zdjęcia (albo wybrane ?ids=1&ids=2) jako jeden ZIP.
+    Uprawnienia – jedno zapytanie; archiwum powstaje w trakcie wysyłania.
+    """
+    stmt = text("""
+        SELECT DISTINCT p.id, p.title, p.file_path FROM photos p
+        JOIN purchases pu ON p.id = pu.photo_id
+        WHERE pu.user_id = :uid {subset}
+        ORDER BY p.id
+    """.format(subset="AND p.id IN :ids" if ids else ""))
+    params = {"uid": user_id}
+    if ids:
+        stmt = stmt.bindparams(bindparam("ids", expanding=True))
+        params["ids"] = list(set(ids))
+    rows = db.execute(stmt, params).all()
+    db.close()      # połączenie nie jest potrzebne przez cały czas wysyłania
+
+    if not rows or (ids and len(rows) != len(set(ids))):
+        raise HTTPException(status_code=404, detail="Nie znaleziono pliku lub brak dostępu")
+
+    entries, missing = [], []
+    for r in rows:
+        path = media_paths.resolve(r.file_path) if r.file_path else None
+        if path is None:
+            missing.append(str(r.id))
+            continue
+        entries.append((f"{r.id}_{safe_name(r.title, 'zdjecie')}{path.suffix}", path))
+    if not entries:
+        raise HTTPException(status_code=404, detail="Plik nie znaleziony na dysku")
 
+    headers = {
+        "Content-Disposition": "attachment; filename=zakupione_zdjecia.zip",
+        "Cache-Control": "private, no-cache",
+    }
+    if missing:
+        headers["X-Missing-Photos"] = ",".join(missing)
+    return StreamingResponse(stream_zip(entries), media_type="application/zip", headers=headers)
 
 
 @router.get("/{photo_id}/file")
@@ -237,12 +405,41 @@ def get_file(photo_id: int, db: Session = Depends(get_db)):
     if not photo or not photo.file_path:
         raise HTTPException(404, "Plik nie istnieje")
 
-    path = Path(photo.file_path)
-    if not path.exists():
+    path = media_paths.resolve(photo.file_path)
+    if path is None:
+        raise HTTPException(404, "Plik nie znaleziony na dysku")
+
+    return serve_file(path)
+
+# ─── streaming wideo ──────────────────────────────────────
+@router.get("/stream/{photo_id}/hls")
+def stream_video_hls(photo_id: int, db: Session = Depends(get_db)):
+    """
+    Przekierowanie na master playlistę HLS – playlisty i segmenty serwuje
+    montowanie /media jako zwykłe pliki (utils/hls.py).
+    """
+    photo = db.get(models.Photo, photo_id)
+    if not photo:
+        raise HTTPException(404, "Zdjęcie nie znalezione")
+    if not photo.hls_playlist:
+        if photo.media_status == "pending":
+            raise HTTPException(503, "Wideo jest jeszcze przygotowywane",
+                                headers={"Retry-After": "30"})
+        raise HTTPException(404, "Brak wersji HLS")
+    return RedirectResponse(f"/{photo.hls_playlist}", status_code=307)
+
+@router.get("/stream/{photo_id}")
+def stream_video(photo_id: int, db: Session = Depends(get_db)):
+    photo = db.get(models.Photo, photo_id)
+    if not photo:
+        raise HTTPException(404, "Zdjęcie nie znalezione")
+
+    path = media_paths.resolve(photo.file_path)
+    if path is None:
         raise HTTPException(404, "Plik nie znaleziony na dysku")
 
-    media_type, _ = mimetypes.guess_type(str(path))
-    return FileResponse(path, media_type=media_type)
+    # Range / multipart, If-Range, ETag, 304 i sendfile – utils/file_serving.py
+    return serve_file(path)
 
 @router.delete("/{photo_id}", status_code=204)
 def delete_photo(
@@ -260,13 +457,12 @@ def delete_photo(
     if photo.owner_id != current_user_id and admin_user.role != "admin":
         raise HTTPException(status_code=403, detail="Brak dostępu")  # forbidden
 
-    # usuń pliki z dysku
-    for _p in (photo.file_path, photo.thumb_path):
-        if _p and Path(_p).exists():
-            Path(_p).unlink(missing_ok=True)
+    # usuń pliki z dysku (tylko gdy to ostatnie zdjęcie z tą treścią)
+    media_store.release_blob(db, photo.file_path, photo.thumb_path)
 
     db.delete(photo)
     db.commit()
+    catalog_cache.bump()
 
 @router.put("/{photo_id}", response_model=schemas.PhotoOut)
 def update_photo(
@@ -299,6 +495,7 @@ def update_photo(
         db.add(models.PhotoCategory(photo_id=photo.id, category_id=cat_id))
 
     db.commit()
+    catalog_cache.bump()
     db.refresh(photo)
     return build_photo_response(photo)
 
@@ -335,20 +532,46 @@ def download_photo(
     if not photo.file_path:
         raise HTTPException(status_code=404, detail="Brak dostępu do pliku")
 
-    file_path = Path(photo.file_path)
-    if not file_path.exists():
+    file_path = media_paths.resolve(photo.file_path)
+    if file_path is None:
         raise HTTPException(status_code=404, detail="Plik nie znaleziony na dysku")
 
-    media_type, _ = mimetypes.guess_type(str(file_path))
-    return FileResponse(path=file_path, media_type=media_type, filename=file_path.name)
+    # zakupiony plik – zawsze rewalidacja (ETag), ale bez ponownego pobierania
+    return serve_file(file_path, filename=file_path.name, disposition="attachment",
+                      cache_control="private, no-cache")
 
 
-@router.get("/{photo_id}")
-def get_photo(photo_id: int, db: Session = Depends(get_db)):
-    photo = db.query(models.Photo).options(joinedload(models.Photo.categories), joinedload(models.Photo.owner)).filter(models.Photo.id == photo_id).first()
-    if not photo:
-        raise HTTPException(status_code=404, detail="Zdjęcie nie znalezione")
+@router.get("/download/{photo_id}/link")
+def download_photo_link(
+    photo_id: int,
+    user_id: int = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Podpisany, wygasający adres pliku (GET /media/signed/...). Uprawnienia
+    sprawdzane tylko tutaj; samo pobieranie nie dotyka już bazy.
+    """
+    stmt = text("""
+        SELECT p.file_path FROM photos p
+        JOIN purchases pu ON p.id = pu.photo_id
+        WHERE pu.user_id = :uid AND p.id = :photo_id
+        LIMIT 1
+    """)
+    stored = db.execute(stmt, {"uid": user_id, "photo_id": photo_id}).scalar()
+    if not stored:
+        raise HTTPException(status_code=404, detail="Nie znaleziono pliku lub brak dostępu")
+
+    file_path = media_paths.resolve(stored)
+    if file_path is None:
+        raise HTTPException(status_code=404, detail="Plik nie znaleziony na dysku")
+
+    rel = file_path.relative_to(media_paths.MEDIA_DIR).as_posix()
+    url, exp = signed_urls.sign(rel, filename=file_path.name)
+    return {"url": f"{API_BASE}{url}", "expires_at": exp}
+
 
+def build_photo_details(photo: models.Photo) -> dict:
+    """Szczegóły zdjęcia (kategorie + właściciel) w formacie GET /photos/{photo_id}."""
     category_names = [cat.name for cat in photo.categories] if photo.categories else []
 
     return {
@@ -364,42 +587,214 @@ def get_photo(photo_id: int, db: Session = Depends(get_db)):
     }
 
 
+def load_photo_details(db: Session, photo_ids: List[int]) -> List[dict]:
+    """
+    Jedno zapytanie po wiele zdjęć (z kategoriami i właścicielem).
+    Wynik w kolejności photo_ids; nieistniejące id są pomijane.
+    """
+    if not photo_ids:
+        return []
+    photos = db.query(models.Photo).options(
+        joinedload(models.Photo.categories),
+        joinedload(models.Photo.owner)
+    ).filter(models.Photo.id.in_(set(photo_ids))).all()
+    by_id = {p.id: p for p in photos}
+    return [build_photo_details(by_id[pid]) for pid in photo_ids if pid in by_id]
+
+
+MAX_BATCH_IDS = 200
+
+
+@router.get("/batch")
+def get_photos_batch(
+    request: Request,
+    ids: str = Query(..., description="id zdjęć oddzielone przecinkami, np. 3,1,7"),
+    db: Session = Depends(get_db),
+):
+    try:
+        photo_ids = [int(x) for x in ids.split(",") if x.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Nieprawidłowa lista id")
+    if len(photo_ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"Maksymalnie {MAX_BATCH_IDS} id w jednym zapytaniu")
+
+    cache_key = catalog_cache.key_for(request)
+    cached = catalog_cache.lookup(request, cache_key)
+    if cached:
+        return cached
+    version = catalog_cache.version
+
+    payload = load_photo_details(db, photo_ids)
+    return catalog_cache.store(cache_key, payload, version=version, request=request)
+
+
+@router.get("/{photo_id}")
+def get_photo(photo_id: int, request: Request, db: Session = Depends(get_db)):
+    cache_key = catalog_cache.key_for(request)
+    cached = catalog_cache.lookup(request, cache_key)
+    if cached:
+        return cached
+    version = catalog_cache.version
+
+    photo = db.query(models.Photo).options(joinedload(models.Photo.categories), joinedload(models.Photo.owner)).filter(models.Photo.id == photo_id).first()
+    if not photo:
+        raise HTTPException(status_code=404, detail="Zdjęcie nie znalezione")
+
+    return catalog_cache.store(cache_key, build_photo_details(photo), version=version, request=request)
+
+
 #UPLOAD
 @router.post("/start-upload")
-def start_upload(total_chunks: int = Form(...), db: Session = Depends(get_db), user_id: int = Depends(get_current_user)):
+def start_upload(
+    total_chunks: int = Form(..., gt=0, le=chunk_store.MAX_TOTAL_CHUNKS),
+    chunk_size: int = Form(default=chunk_store.DEFAULT_CHUNK_SIZE, gt=0, le=chunk_store.MAX_CHUNK_SIZE),
+    total_size: int | None = Form(default=None, gt=0, le=chunk_store.MAX_UPLOAD_SIZE),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user)
+):
+    if (total_chunks - 1) * chunk_size >= chunk_store.MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail="Upload exceeds the maximum file size")
+    if total_size is not None and not (
+        (total_chunks - 1) * chunk_size < total_size <= total_chunks * chunk_size
+    ):
+        raise HTTPException(status_code=400, detail="total_size does not match total_chunks * chunk_size")
+
     upload_id = str(uuid4())
+    spool = chunk_store.create_spool(upload_id, total_size)
     session = UploadSession(
         upload_id=upload_id,
         user_id=user_id,
         total_chunks=total_chunks,
-        received_chunks=0
+        received_chunks=0,
+        chunk_size=chunk_size,
+        total_size=total_size,
+        spool_path=str(spool),
     )
     db.add(session)
     db.commit()
-    return {"upload_id": upload_id}
+    return {"upload_id": upload_id, "chunk_size": chunk_size}
 
-upload_buffers = {} 
 
 @router.post("/upload-chunk")
 async def upload_chunk(
     upload_id: str = Form(...),
     chunk_index: int = Form(...),
     chunk: UploadFile = File(...),
+    checksum: str | None = Form(default=None),   # opcjonalny sha256 (hex) kawałka
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user)
+):
+    session = await run_in_threadpool(
+        lambda: db.query(UploadSession).filter(
+            and_(UploadSession.upload_id == upload_id, UploadSession.user_id == user_id)
+        ).first()
+    )
+    if not session or session.is_finished:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if upload_gc.is_expired(session.last_activity_at):
+        raise HTTPException(status_code=410, detail="Upload session expired")
+    if not 0 <= chunk_index < session.total_chunks:
+        raise HTTPException(status_code=400, detail="Chunk index out of range")
+
+    content = await chunk.read(session.chunk_size + 1)
+    is_last = chunk_index == session.total_chunks - 1
+    if len(content) > session.chunk_size or (not is_last and len(content) != session.chunk_size):
+        raise HTTPException(status_code=400, detail="Invalid chunk size")
+
+    # hash i pwrite+fsync w wątkach – do 64 MB nie blokuje pętli zdarzeń
+    digest = await aio.sha256_hex(content)
+    if checksum and checksum.lower() != digest:
+        raise HTTPException(status_code=422, detail=f"Checksum mismatch for chunk {chunk_index}")
+
+    # najpierw dane na dysk, dopiero potem wpis w bazie
+    await aio.write_chunk(Path(session.spool_path), chunk_index * session.chunk_size, content)
+    await run_in_threadpool(record_chunk, db, session.id, chunk_index, digest)
+
+    return {"message": f"Received chunk {chunk_index}", "checksum": digest}
+
+
+def record_chunk(db: Session, session_id: int, chunk_index: int, digest: str) -> None:
+    db.execute(
+        text("""
+            INSERT INTO upload_chunks (upload_session_id, chunk_index, checksum)
+            VALUES (:sid, :idx, :checksum)
+            ON DUPLICATE KEY UPDATE checksum = VALUES(checksum)
+        """),
+        {"sid": session_id, "idx": chunk_index, "checksum": digest},
+    )
+    db.execute(
+        text("""
+            UPDATE upload_sessions
+               SET received_chunks = (SELECT COUNT(*) FROM upload_chunks WHERE upload_session_id = :sid),
+                   last_activity_at = :now
+             WHERE id = :sid
+        """),
+        {"sid": session_id, "now": datetime.utcnow()},
+    )
+    db.commit()
+
+
+@router.get("/upload-sessions/metrics")
+def upload_sessions_metrics(
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(check_admin),
+):
+    """Liczniki sweepera (per proces) + bieżący stan sesji w bazie."""
+    active, spooled = db.execute(text("""
+        SELECT COUNT(*), COALESCE(SUM(total_size), 0) FROM upload_sessions
+    """)).one()
+    expired = db.execute(
+        text("SELECT COUNT(*) FROM upload_sessions WHERE last_activity_at < :cutoff"),
+        {"cutoff": upload_gc.expiry_cutoff()},
+    ).scalar()
+    return {
+        **upload_gc.UPLOAD_GC_METRICS,
+        "ttl_seconds": upload_gc.UPLOAD_SESSION_TTL,
+        "active_sessions": active,
+        "expired_sessions_pending": expired,
+        "spooled_bytes_reserved": int(spooled),
+    }
+
+
+@router.get("/upload/{upload_id}")
+def upload_status(
+    upload_id: str,
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user)
 ):
-    session = db.query(UploadSession).filter(and_(UploadSession.upload_id == upload_id, UploadSession.user_id == user_id)).first()
+    """
+    Stan sesji uploadu do wznowienia: bitmapa odebranych kawałków
+    (base64, bit i = bajt i // 8, maska 0x80 >> i % 8), lista brakujących
+    indeksów i sha256 każdego zapisanego kawałka.
+    """
+    session = db.query(UploadSession).filter(
+        (UploadSession.upload_id == upload_id) & (UploadSession.user_id == user_id)
+    ).first()
     if not session:
         raise HTTPException(status_code=404, detail="Upload session not found")
 
-    content = await chunk.read()
-    if upload_id not in upload_buffers:
-        upload_buffers[upload_id] = {}
-    upload_buffers[upload_id][chunk_index] = content
-    session.received_chunks = len(upload_buffers[upload_id])
-    db.commit()
+    rows = db.query(models.UploadChunk.chunk_index, models.UploadChunk.checksum).filter(
+        models.UploadChunk.upload_session_id == session.id
+    ).all()
 
-    return {"message": f"Received chunk {chunk_index}"}
+    bitmap = bytearray((session.total_chunks + 7) // 8)
+    checksums = {}
+    for idx, digest in rows:
+        bitmap[idx // 8] |= 0x80 >> (idx % 8)
+        checksums[idx] = digest
+    missing = [i for i in range(session.total_chunks) if i not in checksums]
+
+    return {
+        "upload_id": session.upload_id,
+        "total_chunks": session.total_chunks,
+        "chunk_size": session.chunk_size,
+        "total_size": session.total_size,
+        "received_chunks": len(checksums),
+        "bitmap": base64.b64encode(bytes(bitmap)).decode(),
+        "missing_chunks": missing,
+        "checksums": checksums,
+        "is_finished": bool(session.is_finished),
+    }
 
 @router.post("/finish-upload", response_model=schemas.PhotoOut)
 def finish_upload(
@@ -413,32 +808,31 @@ def finish_upload(
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user)
 ):
+    # blokada wiersza – dwa równoległe finish-upload nie przeniosą pliku dwa razy
     session = db.query(UploadSession).filter(
         (UploadSession.upload_id == upload_id) & (UploadSession.user_id == user_id)
-    ).first()
+    ).with_for_update().first()
     if not session or session.is_finished:
         raise HTTPException(status_code=404, detail="Upload session invalid or already completed")
 
-    chunks_dict = upload_buffers.get(upload_id)
-    if not chunks_dict or len(chunks_dict) != session.total_chunks:
+    received = db.query(func.count(models.UploadChunk.chunk_index)).filter(
+        models.UploadChunk.upload_session_id == session.id
+    ).scalar()
+    if received != session.total_chunks:
         raise HTTPException(status_code=400, detail="Not all chunks received")
 
-    ordered = [chunks_dict[i] for i in sorted(chunks_dict.keys())]
-    final_data = b''.join(ordered)
+    spool = Path(session.spool_path)
+    if session.total_size and spool.stat().st_size != session.total_size:
+        raise HTTPException(status_code=400, detail="Uploaded size does not match total_size")
 
     ext = Path(original_filename).suffix.lower()
     ALLOWED = {".jpg", ".jpeg", ".png", ".mp4", ".mov"}
     if ext not in ALLOWED:
         ext = ".bin"
 
-    file_name = f"{uuid4().hex}{ext}"
-    file_path = MEDIA_DIR / file_name
-
-    with file_path.open("wb") as f:
-        f.write(final_data)
-
-    thumb_path = THUMBS_DIR / f"{file_path.stem}.jpg"
-    create_thumbnail(file_path, thumb_path)
+    # kawałki przychodzą w dowolnej kolejności – hash liczony raz, z gotowego pliku
+    sha256, size = media_store.hash_file(spool)
+    blob = media_store.acquire_blob(db, spool, sha256, size, ext)
 
     photo_id = add_photo_via_proc(
         db,
@@ -446,19 +840,19 @@ def finish_upload(
         description,
         category,
         price,
-        str(file_path),
-        str(thumb_path) if thumb_path.exists() else None,
+        str(blob.file_path),
+        str(blob.thumb_path),
         user_id
     )
 
     for cat_id in category_ids:
         db.add(models.PhotoCategory(photo_id=photo_id, category_id=cat_id))
 
+    media_store.attach_derivatives(db, photo_id, blob)
+
     db.delete(session)
     db.commit()
-
-    if upload_id in upload_buffers:
-        del upload_buffers[upload_id]
+    catalog_cache.bump()
 
     photo = db.query(models.Photo).filter(models.Photo.id == photo_id).first()
     return build_photo_response(photo)
@@ -483,6 +877,7 @@ def set_photo_categories(
         db.add(models.PhotoCategory(photo_id=photo_id, category_id=cat_id))
 
     db.commit()
+    catalog_cache.bump()
     return {"message": "Kategorie zaktualizowane"}
 
 
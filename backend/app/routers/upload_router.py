@@ -1,6 +1,6 @@
 # app/routers/upload_router.py
 from pathlib import Path
-import shutil, uuid, mimetypes
+import shutil, uuid, mimetypes, os
 from typing import Annotated
 
 from fastapi import (
@@ -13,13 +13,16 @@ from fastapi import (
     Header,
 )
 from fastapi.responses import StreamingResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
 from app.database import get_db
 from app import models, schemas
-from app.utils.thumbnails import create_image_thumb, create_video_thumb
+from app.utils import media_store
+from app.utils import media_paths
+from app.utils import aio
+from app.utils.cache import catalog_cache
 
 CHUNK = 1024 * 1024     # 1 MB
 
@@ -36,8 +39,8 @@ def file_iterator(path: Path, start: int, end: int, chunk_size: int = CHUNK):
             yield chunk
 
 # ─────────────────────────── konfiguracja ───────────────────────────
-MEDIA_DIR   = Path("media")          # ./backend/media
-THUMB_DIR   = MEDIA_DIR / "thumbs"
+MEDIA_DIR   = media_paths.MEDIA_DIR  # ./backend/media/ab/cd/...
+THUMB_DIR   = media_paths.THUMBS_DIR
 CHUNK_SIZE  = 1024 * 1024           # 1 MB
 
 for d in (MEDIA_DIR, THUMB_DIR):
@@ -45,11 +48,11 @@ for d in (MEDIA_DIR, THUMB_DIR):
 
 router = APIRouter(prefix="/photos", tags=["photos"])
 
-def add_photo_via_proc(db: Session, title, description, category, price, file_path, thumb_path, owner_id):
+def add_photo_via_proc(db: Session, title, description, category, price, file_path, thumb_path, owner_id) -> int:
     sql = text("""
         CALL add_photo(:title, :description, :category, :price, :file_path, :thumb_path, :owner_id)
     """)
-    db.execute(sql, {
+    result = db.execute(sql, {
         "title": title,
         "description": description,
         "category": category,
@@ -58,7 +61,27 @@ def add_photo_via_proc(db: Session, title, description, category, price, file_pa
         "thumb_path": thumb_path,
         "owner_id": owner_id,
     })
+    photo_id = result.scalar()     # procedura zwraca SELECT LAST_INSERT_ID()
+    result.close()
+    return photo_id
+
+def store_uploaded_photo(db: Session, tmp_path, sha256, size, suffix,
+                         title, description, category, price, owner_id) -> int:
+    blob = media_store.acquire_blob(db, tmp_path, sha256, size, suffix)
+    photo_id = add_photo_via_proc(
+        db,
+        title,
+        description,
+        category,
+        price,
+        str(blob.file_path),
+        str(blob.thumb_path),
+        owner_id
+    )
+    # → 4. Miniatura – istniejąca dla tej treści albo zadanie w media_jobs (app.worker)
+    media_store.attach_derivatives(db, photo_id, blob)
     db.commit()
+    return photo_id
 
 # ───────────────────────────── upload ──────────────────────────────
 @router.post("/upload", response_model=schemas.PhotoOut)
@@ -77,94 +100,22 @@ async def upload_photo(
     if suffix not in ALLOWED:
         raise HTTPException(400, "Niedozwolony format pliku")
 
-    # → 2. Zapisywanie na dysk
-    uid        = uuid.uuid4().hex
-    file_path  = MEDIA_DIR / f"{uid}{suffix}"
-    with file_path.open("wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # → 3. Generowanie miniatury
-    thumb_path: Path | None = None
-    if suffix in {".jpg", ".jpeg", ".png"}:
-        thumb_path = THUMB_DIR / f"{uid}.jpg"
-        create_image_thumb(file_path, thumb_path)
-    elif suffix in {".mp4", ".mov"}:
-        thumb_path = THUMB_DIR / f"{uid}.jpg"
-        create_video_thumb(file_path, thumb_path)
+    # → 2. Zapisywanie na dysk w wątku (sha256 w locie, identyczna treść = ten sam plik)
+    tmp_path, sha256, size = await aio.save_upload(file)
 
-    # → 4. Zapis w bazie przez procedurę
+    # → 3. Zapis w bazie przez procedurę – synchroniczna sesja, więc też w wątku
     owner_id = 1  # lub current_user.id jeśli masz auth
-    add_photo_via_proc(
-        db,
-        title,
-        description,
-        category,
-        price,
-        str(file_path),
-        str(thumb_path) if thumb_path else None,
-        owner_id
+    await run_in_threadpool(
+        store_uploaded_photo, db, tmp_path, sha256, size, suffix,
+        title, description, category, price, owner_id
     )
+    catalog_cache.bump()
 
     # Możesz zwrócić dane, ale nie masz obiektu Photo,
     # więc zwróć np. prosty komunikat lub dopisz select by pobrać dane po insert
     return {"message": "Zdjęcie dodane za pomocą procedury."}
 
 # ───────────────────── statyczne miniatury / zdjęcia ─────────────────────
-router.mount("/media", StaticFiles(directory="media"), name="media")
-
-# ─────────────────────────── streaming wideo ────────────────────────────
-@router.get("/stream/{photo_id}")
-def stream_video(
-    photo_id: int,
-    range_header: str | None = Header(default=None, convert_underscores=False, alias="Range"),
-    db: Session = Depends(get_db),
-):
-    photo = db.get(models.Photo, photo_id)
-    if not photo:
-        raise HTTPException(404)
-
-    path = Path(photo.file_path)
-    if not path.exists():
-        raise HTTPException(404)
-
-    mime, _ = mimetypes.guess_type(str(path))
-    mime = mime or "application/octet-stream"
+router.mount("/media", media_paths.MediaStaticFiles(directory="media"), name="media")
 
-    file_size = path.stat().st_size
-    start, end = 0, file_size - 1
-
-    if range_header:
-        try:
-            units, pos = range_header.split("=")
-            if units != "bytes":
-                raise ValueError
-            start_str, end_str = pos.split("-")
-            start = int(start_str)
-            if end_str:
-                end = int(end_str)
-        except ValueError:
-            raise HTTPException(416, "Invalid range header")
-
-    chunk_length = (end - start) + 1
-    headers = {
-        "Content-Range": f"bytes {start}-{end}/{file_size}",
-        "Accept-Ranges": "bytes",
-    }
-
-    def iter_file():
-        with path.open("rb") as f:
-            f.seek(start)
-            remaining = chunk_length
-            while remaining > 0:
-                data = f.read(min(CHUNK_SIZE, remaining))
-                if not data:
-                    break
-                remaining -= len(data)
-                yield data
-
-    return StreamingResponse(
-        iter_file(),
-        status_code = 206 if range_header else 200,
-        media_type  = mime,
-        headers     = headers,
-    )
+# streaming wideo (/photos/stream/...) – app/routers/photos.py
@@ -3,28 +3,27 @@ from datetime import datetime, timedelta
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from passlib.context import CryptContext
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import random
-import smtplib
-from email.mime.text import MIMEText
 from pathlib import Path
 
 from app import models, schemas
 from app.database import SessionLocal
 from app.dependencies import get_current_user, check_admin
 from app.security import create_access_token, verify_token
+from app.utils.cache import catalog_cache, principal_cache
+from app.utils import media_store
+from app.utils import passwords
+from app.utils import mailer
 
 from dotenv import load_dotenv
 import os
 load_dotenv()
-EMAIL_USER = os.getenv("EMAIL_USER")
-EMAIL_PASS = os.getenv("EMAIL_PASS")
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 # ----------------------------- MODELE -----------------------------
@@ -70,7 +69,8 @@ def create_refresh_token(user_id: int, expires_delta: Optional[timedelta] = None
 
 
 # ----------------------------- EMAIL -----------------------------
-def send_activation_email(to_email: str, code: str, purpose: str = "activation"):
+def queue_activation_email(db: Session, to_email: str, code: str, purpose: str = "activation"):
+    """Wiadomość z kodem do outboxa – wyśle ją sender w tle (utils/mailer.py), po commit."""
     if purpose == "activation":
         subject = "FotoBank – Aktywacja konta"
         body = f"""
@@ -104,18 +104,7 @@ Zespół FotoBank
     else:
         raise ValueError("Nieznany typ wiadomości e-mail (activation/reset).")
 
-    message = MIMEText(body)
-    message["Subject"] = subject
-    message["From"] = EMAIL_USER
-    message["To"] = to_email
-
-    try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(EMAIL_USER, EMAIL_PASS)
-            server.send_message(message)
-            print(f"[EMAIL] ({purpose}) wysłany do: {to_email} (kod: {code})")
-    except Exception as e:
-        print(f"[ERROR] Nie udało się wysłać maila ({purpose}) do {to_email}: {e}")
+    mailer.enqueue_email(db, to_email, subject, body)
 
 
 # ----------------------------- REGISTER + LOGIN -----------------------------
@@ -134,7 +123,7 @@ def register_user(
 
     # 2) przygotowanie danych
     activation_code = f"{random.randint(100000, 999999)}"
-    pwd_hash = pwd_context.hash(user_data.password)
+    pwd_hash = passwords.hash_password(user_data.password)
 
     try:
         # 3) ręczna transakcja: oba INSERTy, potem commit albo rollback
@@ -164,7 +153,10 @@ def register_user(
             {"user_id": user_id},
         )
 
-        # 3c) zatwierdzamy oba INSERTy
+        # 3c) mail aktywacyjny do outboxa – w tej samej transakcji
+        queue_activation_email(db, user_data.email, activation_code, purpose="activation")
+
+        # 3d) zatwierdzamy wszystko razem
         db.commit()
     except Exception as e:
         # w razie błędu wycofujemy i zwracamy 400
@@ -176,8 +168,8 @@ def register_user(
     if not new_user:
         raise HTTPException(500, "Nie udało się wczytać nowego użytkownika.")
 
-    # 5) wysyłamy maila aktywacyjnego
-    send_activation_email(new_user.email, activation_code, purpose="activation")
+    # 5) mail wyśle sender w tle
+    mailer.wake()
 
     return new_user
 
@@ -195,10 +187,13 @@ def activate_account(data: ActivationRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/login")
-def login(creds: schemas.UserLogin, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == creds.email).first()
+async def login(creds: schemas.UserLogin, db: Session = Depends(get_db)):
+    # zapytanie w wątku, bcrypt w puli procesów – pętla zdarzeń wolna
+    user = await run_in_threadpool(
+        lambda: db.query(models.User).filter(models.User.email == creds.email).first()
+    )
 
-    if not user or not pwd_context.verify(creds.password, user.hashed_password):
+    if not user or not await passwords.verify_password_async(creds.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Nieprawidłowe dane logowania.")
 
     if user.full_banned:
@@ -263,6 +258,7 @@ def update_user(user_update: schemas.UserUpdate, current_user_id: int = Depends(
         UPDATE users SET username = :username WHERE id = :uid
     """), {"username": user_update.username, "uid": current_user_id})
     db.commit()
+    catalog_cache.bump()  # owner_username w szczegółach zdjęć
 
     row = db.execute(text("""
         SELECT id, email, username, role, banned, full_banned, is_active 
@@ -278,6 +274,7 @@ def update_user(user_update: schemas.UserUpdate, current_user_id: int = Depends(
 def delete_user(current_user_id: int = Depends(get_current_user), db: Session = Depends(get_db)):
     db.execute(text("DELETE FROM users WHERE id = :uid"), {"uid": current_user_id})
     db.commit()
+    principal_cache.invalidate(current_user_id)
 
 
 
@@ -290,10 +287,10 @@ def change_password(data: PasswordChange, current_user_id: int = Depends(get_cur
     if not user:
         raise HTTPException(status_code=404, detail="Użytkownik nie znaleziony")
 
-    if not pwd_context.verify(data.old_password, user["hashed_password"]):
+    if not passwords.verify_password(data.old_password, user["hashed_password"]):
         raise HTTPException(status_code=400, detail="Stare hasło jest nieprawidłowe")
 
-    new_hash = pwd_context.hash(data.new_password)
+    new_hash = passwords.hash_password(data.new_password)
     db.execute(text("UPDATE users SET hashed_password = :pwd WHERE id = :uid"), {
         "pwd": new_hash, "uid": current_user_id
     })
@@ -315,6 +312,7 @@ def set_user_role(user_id: int, role_data: schemas.UserRoleUpdate, db: Session =
         raise HTTPException(status_code=404, detail="User not found")
     user.role = role_data.new_role
     db.commit()
+    principal_cache.invalidate(user.id)
     db.refresh(user)
     return user
 
@@ -326,6 +324,7 @@ def set_ban_status(user_id: int, status: BanStatus, db: Session = Depends(get_db
         raise HTTPException(status_code=404, detail="User not found")
     user.banned = status.banned
     db.commit()
+    principal_cache.invalidate(user.id)
     db.refresh(user)
     return user
 
@@ -337,6 +336,7 @@ def toggle_full_ban(user_id: int, status: FullBanStatus, db: Session = Depends(g
         raise HTTPException(status_code=404, detail="User not found")
     user.full_banned = status.full_banned
     db.commit()
+    principal_cache.invalidate(user.id)
     db.refresh(user)
     return user
 
@@ -487,8 +487,9 @@ def resend_activation_code(data: ResendRequest, db: Session = Depends(get_db)):
 
     new_code = f"{random.randint(100000, 999999)}"
     user.activation_code = new_code
+    queue_activation_email(db, user.email, new_code, purpose="activation")
     db.commit()
-    send_activation_email(user.email, new_code, purpose="activation")
+    mailer.wake()
     return {"message": "Kod aktywacyjny został wysłany ponownie."}
 
 
@@ -505,8 +506,9 @@ def request_password_reset(data: ResetPasswordRequest, db: Session = Depends(get
 
     code = f"{random.randint(100000, 999999)}"
     user.activation_code = code
+    queue_activation_email(db, user.email, code, purpose="reset")
     db.commit()
-    send_activation_email(user.email, code, purpose="reset")
+    mailer.wake()
     return {"message": "Kod resetowania został wysłany na e-mail."}
 
 
@@ -523,7 +525,7 @@ def reset_password(data: PasswordReset, db: Session = Depends(get_db)):
     za pomocą surowego zapytania SQL.
     """
     # 1) Zahashuj nowe hasło
-    new_hash = pwd_context.hash(data.new_password)
+    new_hash = passwords.hash_password(data.new_password)
 
     try:
         # 2) Wykonaj raw query w ramach jednej transakcji
@@ -562,16 +564,13 @@ def reset_password(data: PasswordReset, db: Session = Depends(get_db)):
 
 # ----------------------------- USUWANIE UŻYTKOWNIKA -----------------------------
 def delete_user_files(db: Session, user_id: int):
+    # pliki współdzielone z innymi zdjęciami (ta sama treść) zostają na dysku
     photos = db.query(models.Photo).filter(models.Photo.owner_id == user_id).all()
     for photo in photos:
-        for file_path in [photo.file_path, photo.thumb_path]:
-            if file_path:
-                p = Path(file_path)
-                if p.exists():
-                    try:
-                        p.unlink()
-                    except Exception as e:
-                        print(f"Błąd usuwania pliku {p}: {e}")
+        try:
+            media_store.release_blob(db, photo.file_path, photo.thumb_path)
+        except Exception as e:
+            print(f"Błąd usuwania pliku {photo.file_path}: {e}")
 
 @router.delete("/users/delete/{user_id}", status_code=204)
 def delete_user_full(
@@ -590,6 +589,8 @@ def delete_user_full(
 
     db.execute(text("CALL delete_user_and_related(:uid)"), {"uid": user_id})
     db.commit()
+    catalog_cache.bump()
+    principal_cache.invalidate(user_id)
 
     return {"detail": "Konto i dane użytkownika zostały usunięte"}
 
@@ -80,6 +80,13 @@ class PhotoRead(PhotoBase):
         from_attributes = True
 
 
+class RenditionOut(BaseModel):
+    width: int
+    height: int
+    format: str
+    url: str
+
+
 class PhotoOut(BaseModel):
     id: int
     title: str
@@ -94,6 +101,9 @@ class PhotoOut(BaseModel):
     thumb_url: Optional[str] = None
     category_ids: List[int] = []
     purchases_number: int = 0
+    media_status: str = "ready"
+    renditions: List[RenditionOut] = []
+    hls_url: Optional[str] = None           # master.m3u8 (tylko wideo, po spakowaniu)
 
     class Config:
         from_attributes = True
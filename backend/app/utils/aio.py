@@ -0,0 +1,50 @@
+# app/utils/aio.py
+"""
+Operacje na plikach mediów wywoływane z handlerów async.
+
+Zapis/odczyt dysku, fsync i liczenie sha256 idą do puli wątków – pętla
+zdarzeń w tym czasie obsługuje inne żądania (np. katalog). Równoległych
+operacji dyskowych jest najwyżej MEDIA_IO_CONCURRENCY na proces, żeby
+kilka dużych uploadów nie zajęło wszystkich wątków puli (40 domyślnie),
+z których korzystają też zwykłe endpointy `def`.
+"""
+import functools
+import hashlib
+import os
+from pathlib import Path
+
+import anyio
+from fastapi import UploadFile
+
+from app.utils import chunk_store, media_store
+
+MEDIA_IO_CONCURRENCY = int(os.getenv("MEDIA_IO_CONCURRENCY", "8"))
+
+_media_io_limiter: anyio.CapacityLimiter | None = None
+
+
+def media_io_limiter() -> anyio.CapacityLimiter:
+    global _media_io_limiter
+    if _media_io_limiter is None:
+        _media_io_limiter = anyio.CapacityLimiter(MEDIA_IO_CONCURRENCY)
+    return _media_io_limiter
+
+
+async def run_media_io(func, *args, **kwargs):
+    """Wywołuje blokującą funkcję w wątku, w ramach limitu MEDIA_IO_CONCURRENCY."""
+    return await anyio.to_thread.run_sync(
+        functools.partial(func, *args, **kwargs), limiter=media_io_limiter()
+    )
+
+
+async def save_upload(upload: UploadFile) -> tuple[Path, str, int]:
+    """media_store.write_stream bez blokowania pętli: (tmp_path, sha256, size)."""
+    return await run_media_io(media_store.write_stream, upload.file)
+
+
+async def sha256_hex(data: bytes) -> str:
+    return await run_media_io(lambda: hashlib.sha256(data).hexdigest())
+
+
+async def write_chunk(path: Path, offset: int, data: bytes) -> None:
+    await run_media_io(chunk_store.write_chunk, path, offset, data)
@@ -0,0 +1,155 @@
+# app/utils/cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+class ResponseCache:
+    """
+    Wersjonowany cache odpowiedzi JSON (LRU + TTL) dla katalogu zdjęć.
+
+    Każdy zapis do katalogu woła bump(), co podbija wersję i unieważnia
+    wszystkie wpisy. TTL ogranicza nieaktualność przy kilku workerach
+    (każdy ma własną wersję) i przy zmianach robionych przez bazę
+    (triggery, worker mediów). ETag to hash treści odpowiedzi, więc 304
+    dostaje tylko klient, który ma dokładnie to, co zwrócilibyśmy teraz:
+    z żywego wpisu albo po ponownym policzeniu w store().
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = 0
+        self._entries: OrderedDict[str, tuple[float, str, bytes, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bump(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    @staticmethod
+    def key_for(request: Request) -> str:
+        """Ścieżka + posortowane parametry (kolejność w URL nie ma znaczenia)."""
+        params = sorted(request.query_params.multi_items())
+        return request.url.path + "?" + "&".join(f"{k}={v}" for k, v in params)
+
+    @staticmethod
+    def etag_for(body: bytes) -> str:
+        return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+    @staticmethod
+    def _not_modified(request: Request | None, etag: str) -> bool:
+        """If-None-Match: lista tagów po przecinku (także W/"..."), albo *."""
+        if request is None:
+            return False
+        header = request.headers.get("if-none-match")
+        if not header:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+        return "*" in tags or etag in tags
+
+    def _respond(self, request: Request | None, etag: str, body: bytes, headers: dict) -> Response:
+        if self._not_modified(request, etag):
+            return Response(status_code=304, headers={**headers, "ETag": etag})
+        return Response(content=body, media_type="application/json",
+                        headers={**headers, "ETag": etag})
+
+    def lookup(self, request: Request, key: str) -> Response | None:
+        """Zwraca 304 / zapisaną odpowiedź albo None, gdy trzeba liczyć od nowa."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, etag, body, headers = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+
+        return self._respond(request, etag, body, headers)
+
+    def store(self, key: str, payload, headers: dict | None = None,
+              version: int | None = None, request: Request | None = None) -> Response:
+        """
+        Serializuje payload i zapisuje go w cache. version to wersja odczytana
+        PRZED zapytaniem do bazy – jeśli w międzyczasie był bump(), wynik nie
+        trafia do cache (mógłby być już nieaktualny). Z request – 304, gdy
+        klient ma już tę treść.
+        """
+        headers = headers or {}
+        body = json.dumps(jsonable_encoder(payload), ensure_ascii=False).encode()
+        etag = self.etag_for(body)
+
+        with self._lock:
+            if version is None or version == self.version:
+                self._entries[key] = (time.monotonic() + self.ttl, etag, body, headers)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return self._respond(request, etag, body, headers)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """To, czego zależności auth potrzebują z wiersza users."""
+    id: int
+    role: str
+    banned: bool
+    full_banned: bool
+
+
+class PrincipalCache:
+    """
+    Cache użytkowników dla check_admin / ensure_not_banned (LRU + krótki TTL).
+
+    Zmiany roli/blokady wołają invalidate(user_id) – w tym procesie działają
+    od razu, w pozostałych workerach najpóźniej po TTL. Wiersz odczytany
+    przed invalidate() nie trafia do cache (jak version w ResponseCache).
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 10.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self._entries: OrderedDict[int, tuple[float, Principal | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, load) -> Principal | None:
+        """Principal z cache albo z load(user_id) (None = brak użytkownika)."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(user_id)
+                return entry[1]
+            generation = self.generation
+
+        principal = load(user_id)
+
+        with self._lock:
+            if generation == self.generation:
+                self._entries[user_id] = (time.monotonic() + self.ttl, principal)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return principal
+
+    def invalidate(self, user_id: int | None = None) -> None:
+        with self._lock:
+            self.generation += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+catalog_cache = ResponseCache()
+principal_cache = PrincipalCache(ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "10")))
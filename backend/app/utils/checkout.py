@@ -0,0 +1,71 @@
+# app/utils/checkout.py
+"""
+Przeniesienie koszyka do zakupów zbiorowo – stała liczba zapytań
+niezależnie od liczby pozycji (add_to_purchased, capture_order):
+
+    1. SELECT ... FOR UPDATE na koszyku (dwa równoległe checkouty
+       tego samego koszyka nie kupią zdjęć dwa razy),
+    2. INSERT INTO purchases ... SELECT FROM cart_items JOIN photos,
+    3. INSERT INTO order_items ... SELECT (tylko z zamówieniem),
+    4. UPDATE photos.purchase_count jednym JOIN-em,
+    5. SUM cen, 6. jeden DELETE koszyka.
+
+MySQL nie pozwala triggerowi zmieniać tabeli, z której czyta wywołujące
+go zapytanie (błąd 1442), dlatego licznik purchase_count dla nowych
+zakupów podbija krok 4, a nie trigger AFTER INSERT (init_sql.py).
+Uwaga: INSERT do purchases z pominięciem checkout_cart (ręcznie, skrypty)
+nie podbija już licznika ani nie czyści koszyka – licznik poprawia
+`python -m app.manage reconcile-purchase-counts`.
+
+SQL jest tylko dla MySQL (FOR UPDATE, UPDATE ... JOIN); porównanie z
+dawną pętlą: benchmarks/bench_checkout.py na prawdziwej bazie.
+Commit robi wywołujący.
+"""
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+def lock_cart(db: Session, user_id: int) -> int | None:
+    return db.execute(text("SELECT id FROM cart WHERE user_id = :uid ORDER BY id LIMIT 1 FOR UPDATE"),
+                      {"uid": user_id}).scalar()
+
+
+def checkout_cart(db: Session, user_id: int, cart_id: int,
+                  order_id: int | None = None, at: datetime | None = None) -> tuple[int, float]:
+    """
+    Kupuje wszystko z koszyka cart_id (zablokowanego przez lock_cart).
+    at=None – czas z bazy (NOW()). Zwraca (liczba zdjęć, kwota); 0 = pusty koszyk.
+    """
+    params = {"uid": user_id, "cid": cart_id, "at": at, "oid": order_id}
+    inserted = db.execute(text("""
+        INSERT INTO purchases (user_id, photo_id, purchase_date, payment_status, total_cost, created_at)
+        SELECT :uid, p.id, COALESCE(:at, NOW()), 'completed', p.price, COALESCE(:at, NOW())
+        FROM (SELECT DISTINCT photo_id FROM cart_items WHERE cart_id = :cid) ci
+        JOIN photos p ON p.id = ci.photo_id
+    """), params).rowcount
+    if not inserted:
+        return 0, 0.0
+
+    if order_id is not None:
+        db.execute(text("""
+            INSERT INTO order_items (order_id, photo_id, price, access_url)
+            SELECT :oid, p.id, p.price, p.file_path
+            FROM (SELECT DISTINCT photo_id FROM cart_items WHERE cart_id = :cid) ci
+            JOIN photos p ON p.id = ci.photo_id
+        """), params)
+
+    db.execute(text("""
+        UPDATE photos p
+        JOIN (SELECT DISTINCT photo_id FROM cart_items WHERE cart_id = :cid) ci ON ci.photo_id = p.id
+        SET p.purchase_count = p.purchase_count + 1
+    """), params)
+
+    total = db.execute(text("""
+        SELECT COALESCE(SUM(p.price), 0) FROM photos p
+        WHERE p.id IN (SELECT photo_id FROM cart_items WHERE cart_id = :cid)
+    """), params).scalar()
+
+    db.execute(text("DELETE FROM cart_items WHERE cart_id = :cid"), params)
+    return inserted, float(total)
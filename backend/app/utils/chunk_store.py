@@ -0,0 +1,66 @@
+# app/utils/chunk_store.py
+"""
+Magazyn kawałków uploadu na dysku (zamiast słownika w pamięci procesu).
+
+Każda sesja ma jeden plik tymczasowy w media_spool/, do którego kawałki
+są zapisywane pod własnym offsetem (pwrite) – w dowolnej kolejności,
+równolegle i z dowolnego workera. Po odebraniu wszystkich kawałków plik
+jest przenoszony do media/ przez os.replace w media_store.acquire_blob
+(atomowo, bez kopiowania – dlatego katalog roboczy leży obok media/,
+w tym samym systemie plików, ale poza katalogiem serwowanym przez
+StaticFiles).
+"""
+import os
+from pathlib import Path
+
+SPOOL_DIR = Path("media_spool")
+SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024          # 1 MB – tyle wysyła frontend
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(16 * 1024 ** 3)))
+# upload-status trzyma bitmapę i listę brakujących o długości total_chunks
+MAX_TOTAL_CHUNKS = MAX_UPLOAD_SIZE // DEFAULT_CHUNK_SIZE
+
+
+def spool_path(upload_id: str) -> Path:
+    return SPOOL_DIR / f"{upload_id}.part"
+
+
+def create_spool(upload_id: str, total_size: int | None = None) -> Path:
+    """Tworzy plik roboczy; przy znanym rozmiarze rezerwuje od razu miejsce."""
+    path = spool_path(upload_id)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        if total_size:
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(fd, 0, total_size)
+            else:
+                os.ftruncate(fd, total_size)
+    finally:
+        os.close(fd)
+    return path
+
+
+def write_chunk(path: Path, offset: int, data: bytes) -> None:
+    """Zapisuje kawałek pod offsetem i wymusza zapis na dysk."""
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def discard(path: Path) -> int:
+    """Usuwa plik roboczy; zwraca liczbę zwolnionych bajtów."""
+    try:
+        size = path.stat().st_size
+        path.unlink()
+        return size
+    except FileNotFoundError:
+        return 0
@@ -0,0 +1,103 @@
+# app/utils/file_serving.py
+"""
+Wspólne serwowanie plików mediów (stream_video, get_file, download_photo).
+
+Na bazie FileResponse ze Starlette, które daje już Range (także kilka
+zakresów naraz – multipart/byteranges), If-Range, ETag i Last-Modified.
+Dokładamy:
+  * 304 Not Modified dla If-None-Match / If-Modified-Since,
+  * Cache-Control,
+  * za nginx – X-Accel-Redirect (MEDIA_ACCEL_REDIRECT_PREFIX): plik wysyła
+    nginx (sendfile), Range/304 obsługuje już on,
+  * większe kawałki odczytu (uvicorn nie ma rozszerzeń ASGI typu pathsend).
+
+Tylko publiczne API FileResponse (konstruktor ze stat_result, __call__,
+chunk_size) – bez nadpisywania prywatnych _handle_*, które Starlette może
+zmienić w dowolnym wydaniu.
+"""
+import mimetypes
+import os
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import quote
+
+from fastapi.responses import FileResponse, Response
+from starlette.datastructures import Headers
+
+from app.utils import media_paths
+
+READ_CHUNK = 1024 * 1024
+# np. "/_protected_media/" -> location /_protected_media/ { internal; alias .../backend/media/; }
+ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "")
+
+DEFAULT_CACHE_CONTROL = "private, max-age=3600"
+
+
+class MediaFileResponse(FileResponse):
+    chunk_size = READ_CHUNK
+
+    def __init__(self, path, *args, cache_control: str = DEFAULT_CACHE_CONTROL, **kwargs):
+        # ETag / Last-Modified od razu w nagłówkach – potrzebne do 304 w __call__
+        # (endpointy z serve_file są synchroniczne, stat nie blokuje pętli)
+        kwargs.setdefault("stat_result", os.stat(path))
+        super().__init__(path, *args, **kwargs)
+        self.headers.setdefault("cache-control", cache_control)
+
+    def is_not_modified(self, request_headers: Headers) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            # porównanie słabe (RFC 9110 13.1.2) – W/ nie ma znaczenia
+            etag = self.headers["etag"].removeprefix("W/")
+            tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+                modified = parsedate_to_datetime(self.headers["last-modified"])
+            except (TypeError, ValueError):
+                return False
+            return modified <= since
+        return False
+
+    async def __call__(self, scope, receive, send) -> None:
+        request_headers = Headers(scope=scope)
+        if (scope["method"] in ("GET", "HEAD") and self.status_code == 200
+                and self.is_not_modified(request_headers)):
+            keep = ("etag", "last-modified", "cache-control", "content-location", "vary")
+            headers = {k: v for k, v in self.headers.items() if k in keep}
+            return await Response(status_code=304, headers=headers)(scope, receive, send)
+
+        await super().__call__(scope, receive, send)
+
+
+def serve_file(
+    path: Path,
+    *,
+    media_type: str | None = None,
+    filename: str | None = None,
+    disposition: str = "inline",
+    cache_control: str = DEFAULT_CACHE_CONTROL,
+) -> Response:
+    """
+    Odpowiedź z plikiem z media/. Uprawnienia sprawdza wywołujący – tu już
+    tylko warunkowe GET, zakresy i możliwie najtańsze wysłanie bajtów.
+    """
+    path = Path(path)
+    if ACCEL_REDIRECT_PREFIX:
+        # nginx wyśle plik sam (sendfile, Range, If-None-Match)
+        rel = path.relative_to(media_paths.MEDIA_DIR).as_posix()
+        headers = {
+            "X-Accel-Redirect": ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(rel),
+            "Cache-Control": cache_control,
+        }
+        if filename is not None:
+            headers["Content-Disposition"] = f"{disposition}; filename*=utf-8''{quote(filename)}"
+        return Response(
+            media_type=media_type or mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+            headers=headers,
+        )
+
+    return MediaFileResponse(path, media_type=media_type, filename=filename,
+                             content_disposition_type=disposition, cache_control=cache_control)
@@ -0,0 +1,118 @@
+# app/utils/hls.py
+"""
+Pakowanie wideo do HLS (offline, w workerze – zadanie 'hls' w media_jobs).
+
+Jedno wywołanie ffmpeg dekoduje źródło raz i koduje całą drabinkę
+bitrate'ów z LADDER (bez szczebli wyższych niż oryginał). Segmenty fMP4
+(CMAF) po SEGMENT_SECONDS s z wyrównanymi klatkami kluczowymi, więc
+odtwarzacz może przełączać jakość na granicy segmentu:
+
+    media/hls/ab/cd/<nazwa>/master.m3u8
+    media/hls/ab/cd/<nazwa>/v0/index.m3u8, init.mp4, seg_00000.m4s, ...
+
+Pliki są statyczne – serwuje je montowanie /media, Python nie jest już
+na ścieżce każdego bajtu (GET /photos/stream/{id}/hls tylko przekierowuje).
+"""
+import json
+import mimetypes
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+from app.utils import media_paths
+
+SEGMENT_SECONDS = 6
+# górny limit jednego kodowania – zawieszony ffmpeg nie trzyma zadania (i heartbeatu) w nieskończoność
+HLS_TIMEOUT = int(os.getenv("HLS_TIMEOUT", str(6 * 3600)))     # s
+MASTER_PLAYLIST = "master.m3u8"
+
+# (wysokość, bitrate wideo, bitrate audio) – od najwyższej jakości
+LADDER = [
+    (1080, "5000k", "192k"),
+    (720, "2800k", "128k"),
+    (480, "1400k", "128k"),
+    (360, "800k", "96k"),
+]
+
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/iso.segment", ".m4s")
+
+
+def probe(src: Path) -> dict:
+    """Wysokość obrazu i obecność ścieżki audio (ffprobe)."""
+    out = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "stream=codec_type,height",
+         "-of", "json", str(src)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    streams = json.loads(out).get("streams", [])
+    heights = [s.get("height") or 0 for s in streams if s.get("codec_type") == "video"]
+    if not heights:
+        raise ValueError(f"Brak ścieżki wideo w {src}")
+    return {"height": max(heights), "audio": any(s.get("codec_type") == "audio" for s in streams)}
+
+
+def ladder_for(height: int) -> list[tuple[int, str, str]]:
+    rungs = [r for r in LADDER if r[0] <= height]
+    return rungs or [(height - height % 2, *LADDER[-1][1:])]
+
+
+def build_command(src: Path, out_dir: Path, rungs: list, audio: bool) -> list[str]:
+    n = len(rungs)
+    split = f"[0:v]split={n}" + "".join(f"[s{i}]" for i in range(n))
+    scales = ";".join(f"[s{i}]scale=-2:{h}[v{i}]" for i, (h, _, _) in enumerate(rungs))
+
+    cmd = ["ffmpeg", "-y", "-v", "error", "-i", str(src),
+           "-filter_complex", f"{split};{scales}"]
+    for i, (_, v_rate, a_rate) in enumerate(rungs):
+        cmd += ["-map", f"[v{i}]",
+                f"-c:v:{i}", "libx264", f"-b:v:{i}", v_rate,
+                f"-maxrate:v:{i}", v_rate, f"-bufsize:v:{i}", v_rate]
+        if audio:
+            cmd += ["-map", "0:a:0", f"-c:a:{i}", "aac", f"-b:a:{i}", a_rate]
+    stream_map = " ".join(f"v:{i},a:{i}" if audio else f"v:{i}" for i in range(n))
+    cmd += [
+        "-preset", "veryfast",
+        "-force_key_frames", f"expr:gte(t,n_forced*{SEGMENT_SECONDS})",
+        "-sc_threshold", "0",
+        "-f", "hls",
+        "-hls_time", str(SEGMENT_SECONDS),
+        "-hls_playlist_type", "vod",
+        "-hls_flags", "independent_segments",
+        "-hls_segment_type", "fmp4",
+        "-hls_fmp4_init_filename", "init.mp4",
+        "-hls_segment_filename", str(out_dir / "v%v" / "seg_%05d.m4s"),
+        "-master_pl_name", MASTER_PLAYLIST,
+        "-var_stream_map", stream_map,
+        str(out_dir / "v%v" / "index.m3u8"),
+    ]
+    return cmd
+
+
+def package_hls(src: Path, out_dir: Path | None = None) -> str:
+    """
+    Tworzy HLS dla pliku wideo; zwraca ścieżkę master playlisty (do photos.hls_playlist).
+    Kodowanie idzie do katalogu tymczasowego obok docelowego i jest
+    podmieniane na końcu – przerwane zadanie nie zostawia połowy drabinki.
+    """
+    src = Path(src)
+    out_dir = Path(out_dir) if out_dir else media_paths.hls_dir(src.stem)
+    info = probe(src)
+    rungs = ladder_for(info["height"])
+
+    out_dir.parent.mkdir(parents=True, exist_ok=True)
+    work = Path(tempfile.mkdtemp(dir=out_dir.parent, prefix=f".{out_dir.name}-"))
+    try:
+        result = subprocess.run(build_command(src, work, rungs, info["audio"]),
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+                                timeout=HLS_TIMEOUT)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg ({result.returncode}): {result.stderr.strip()[-500:]}")
+        shutil.rmtree(out_dir, ignore_errors=True)
+        work.rename(out_dir)
+    except BaseException:
+        shutil.rmtree(work, ignore_errors=True)
+        raise
+    return (out_dir / MASTER_PLAYLIST).as_posix()
@@ -0,0 +1,31 @@
+# app/utils/jobs.py
+from sqlalchemy import text, insert, bindparam
+from sqlalchemy.orm import Session
+
+from app import models
+
+
+def enqueue_media_job(db: Session, photo_id: int, kind: str = "thumbnail") -> None:
+    """
+    Dodaje zadanie do kolejki media_jobs i oznacza zdjęcie jako 'pending'.
+    Nie robi commit – zadanie zapisuje się w tej samej transakcji co zdjęcie.
+    """
+    db.add(models.MediaJob(photo_id=photo_id, kind=kind))
+    db.execute(
+        text("UPDATE photos SET media_status = 'pending' WHERE id = :pid"),
+        {"pid": photo_id},
+    )
+
+
+def enqueue_media_jobs(db: Session, photo_ids: list[int], kind: str = "thumbnail") -> None:
+    """enqueue_media_job dla wielu zdjęć – jeden INSERT (executemany) i jeden UPDATE."""
+    if not photo_ids:
+        return
+    db.execute(insert(models.MediaJob), [
+        {"photo_id": pid, "kind": kind} for pid in photo_ids
+    ])
+    db.execute(
+        text("UPDATE photos SET media_status = 'pending' WHERE id IN :ids")
+        .bindparams(bindparam("ids", expanding=True)),
+        {"ids": photo_ids},
+    )
@@ -0,0 +1,255 @@
+# app/utils/mailer.py
+"""
+Wysyłka e-maili przez tabelę email_outbox (transactional outbox).
+
+Request tylko dopisuje wiersz – w tej samej transakcji co zmiana, której
+dotyczy wiadomość (nowe konto, nowy kod), więc nie czeka na serwer SMTP
+i nie zgubi maila po udanym commit. Sender w tle (lifespan w main.py):
+  * pobiera partie po SEND_BATCH_SIZE (FOR UPDATE SKIP LOCKED – kilka
+    workerów API może wysyłać naraz),
+  * wysyła je jednym, trzymanym otwartym i zalogowanym połączeniem SMTP
+    (nowe dopiero po rozłączeniu, bezczynności albo MAX_PER_CONNECTION),
+  * nieudane ponawia z wykładniczym opóźnieniem, po max_attempts – 'failed'.
+
+Lokalnie zamiast Gmaila wystarczy serwer testowy, np.:
+    python -m aiosmtpd -n -l localhost:8025
+    SMTP_HOST=localhost SMTP_PORT=8025 SMTP_SSL=0 uvicorn app.main:app
+"""
+import asyncio
+import os
+import smtplib
+import time
+from email.mime.text import MIMEText
+
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text, bindparam
+from sqlalchemy.orm import Session
+
+from app import models
+
+load_dotenv()
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SSL = os.getenv("SMTP_SSL", "1") == "1"       # 0 = zwykłe SMTP (+ STARTTLS, jeśli serwer oferuje)
+EMAIL_USER = os.getenv("EMAIL_USER")
+EMAIL_PASS = os.getenv("EMAIL_PASS")
+SMTP_TIMEOUT = int(os.getenv("SMTP_TIMEOUT", "30"))     # s – na każdą operację gniazda
+
+SEND_BATCH_SIZE = 50
+SEND_INTERVAL = float(os.getenv("EMAIL_SEND_INTERVAL", "2"))     # s – gdy kolejka jest pusta
+MAX_PER_CONNECTION = 100     # potem nowe połączenie (limity dostawcy)
+IDLE_TIMEOUT = 60            # s – dłużej bezczynne połączenie jest zamykane
+HEARTBEAT_INTERVAL = 30      # s – co tyle send_batch odświeża locked_at swojej partii
+STALE_AFTER = max(300, 10 * SMTP_TIMEOUT)   # s – 'sending' bez heartbeatu = sender padł, wiadomość wraca do kolejki
+BACKOFF_BASE = 30            # s – 30, 60, 120, ...
+
+_wakeup: tuple[asyncio.AbstractEventLoop, asyncio.Event] | None = None
+
+
+def enqueue_email(db: Session, to_email: str, subject: str, body: str) -> None:
+    """Dopisuje wiadomość do outboxa. Commit robi wywołujący (razem ze swoją zmianą)."""
+    db.add(models.EmailOutbox(to_email=to_email, subject=subject, body=body))
+
+
+def wake() -> None:
+    """Budzi sender w tym procesie (po commit), żeby nie czekał SEND_INTERVAL."""
+    if _wakeup is not None:
+        loop, event = _wakeup
+        loop.call_soon_threadsafe(event.set)
+
+
+# ---------- połączenie SMTP ----------
+
+class SmtpConnection:
+    """Jedno zalogowane połączenie używane przez kolejne partie."""
+
+    def __init__(self):
+        self._smtp: smtplib.SMTP | None = None
+        self._sent = 0
+        self._last_used = 0.0
+
+    def _connect(self) -> smtplib.SMTP:
+        if SMTP_SSL:
+            smtp = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        else:
+            smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+            smtp.ehlo()
+            if smtp.has_extn("starttls"):
+                smtp.starttls()
+                smtp.ehlo()
+        if EMAIL_USER and EMAIL_PASS:
+            smtp.login(EMAIL_USER, EMAIL_PASS)
+        self._sent = 0
+        return smtp
+
+    def _get(self) -> smtplib.SMTP:
+        stale = (time.monotonic() - self._last_used > IDLE_TIMEOUT
+                 or self._sent >= MAX_PER_CONNECTION)
+        if self._smtp is not None and stale:
+            self.close()
+        if self._smtp is None:
+            self._smtp = self._connect()
+        return self._smtp
+
+    def send(self, message: MIMEText) -> None:
+        """Wysyła jedną wiadomość; ConnectionError = problem z serwerem, nie z tą wiadomością."""
+        try:
+            try:
+                self._get().send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                # serwer zamknął połączenie między partiami – jedna próba na nowym
+                self.close()
+                self._get().send_message(message)
+        except smtplib.SMTPResponseException as e:
+            if e.smtp_code == 421 or isinstance(e, smtplib.SMTPAuthenticationError):
+                self.close()
+                raise ConnectionError(f"SMTP {e.smtp_code}: {e.smtp_error!r}") from e
+            raise       # odrzucony nadawca/treść – połączenie nadal dobre
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPNotSupportedError):
+            raise       # np. adres spoza ASCII bez SMTPUTF8 – wina tej wiadomości
+        except OSError as e:        # także SMTPServerDisconnected, SMTPConnectError
+            self.close()
+            raise ConnectionError(f"{type(e).__name__}: {e}") from e
+        finally:
+            self._last_used = time.monotonic()
+        self._sent += 1
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except OSError:
+                pass
+            self._smtp = None
+
+
+# ---------- kolejka ----------
+
+def requeue_stale(db: Session) -> None:
+    db.execute(text("""
+        UPDATE email_outbox SET status = 'pending', locked_at = NULL
+        WHERE status = 'sending' AND locked_at < NOW() - INTERVAL :stale SECOND
+    """), {"stale": STALE_AFTER})
+    db.commit()
+
+
+def heartbeat(db: Session, ids: list[int]) -> None:
+    """
+    Partia może wysyłać się dłużej niż STALE_AFTER (SEND_BATCH_SIZE wiadomości,
+    każda do kilku operacji po SMTP_TIMEOUT) – świeży locked_at chroni jeszcze
+    niewysłane i wysłane-ale-nieoznaczone wiadomości przed requeue_stale.
+    """
+    db.execute(text("""
+        UPDATE email_outbox SET locked_at = NOW()
+         WHERE status = 'sending' AND id IN :ids
+    """).bindparams(bindparam("ids", expanding=True)), {"ids": ids})
+    db.commit()
+
+
+def claim_batch(db: Session, limit: int = SEND_BATCH_SIZE) -> list[dict]:
+    rows = db.execute(text("""
+        SELECT id, to_email, subject, body, attempts, max_attempts
+        FROM email_outbox
+        WHERE status = 'pending' AND run_after <= NOW()
+        ORDER BY id
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    """), {"limit": limit}).mappings().all()
+    if rows:
+        db.execute(text("""
+            UPDATE email_outbox
+               SET status = 'sending', locked_at = NOW(), attempts = attempts + 1
+             WHERE id IN :ids
+        """).bindparams(bindparam("ids", expanding=True)), {"ids": [r["id"] for r in rows]})
+    db.commit()
+    return [dict(r, attempts=r["attempts"] + 1) for r in rows]
+
+
+def mark_failed(db: Session, item: dict, error: Exception) -> None:
+    message = f"{type(error).__name__}: {error}"[:1024]
+    if item["attempts"] >= item["max_attempts"]:
+        db.execute(text("""
+            UPDATE email_outbox SET status = 'failed', last_error = :err, locked_at = NULL WHERE id = :id
+        """), {"id": item["id"], "err": message})
+    else:
+        delay = BACKOFF_BASE * 2 ** (item["attempts"] - 1)
+        db.execute(text("""
+            UPDATE email_outbox
+               SET status = 'pending', last_error = :err, locked_at = NULL,
+                   run_after = NOW() + INTERVAL :delay SECOND
+             WHERE id = :id
+        """), {"id": item["id"], "err": message, "delay": delay})
+    print(f"[email] wiadomość {item['id']} do {item['to_email']} "
+          f"próba {item['attempts']}/{item['max_attempts']} nieudana: {message}")
+
+
+def send_batch(db: Session, connection: SmtpConnection) -> int:
+    """Jedna partia z outboxa. Zwraca liczbę pobranych wiadomości."""
+    batch = claim_batch(db)
+    ids = [item["id"] for item in batch]
+    sent = []
+    beat = time.monotonic()
+    for i, item in enumerate(batch):
+        if time.monotonic() - beat >= HEARTBEAT_INTERVAL:
+            heartbeat(db, ids)
+            beat = time.monotonic()
+        message = MIMEText(item["body"])
+        message["Subject"] = item["subject"]
+        message["From"] = EMAIL_USER or "fotobank@localhost"
+        message["To"] = item["to_email"]
+        try:
+            connection.send(message)
+            sent.append(item["id"])
+        except ConnectionError as e:
+            # serwer niedostępny – reszta partii czeka razem z tą wiadomością
+            for rest in batch[i:]:
+                mark_failed(db, rest, e)
+            break
+        except smtplib.SMTPException as e:
+            mark_failed(db, item, e)
+    if sent:
+        db.execute(text("""
+            UPDATE email_outbox SET status = 'sent', sent_at = NOW(), locked_at = NULL
+             WHERE id IN :ids
+        """).bindparams(bindparam("ids", expanding=True)), {"ids": sent})
+    db.commit()
+    return len(batch)
+
+
+def _requeue(db: Session) -> None:
+    """requeue_stale, który nie zatrzymuje sendera (np. chwilowy brak bazy)."""
+    try:
+        requeue_stale(db)
+    except Exception as e:
+        db.rollback()
+        print(f"[email] błąd requeue: {type(e).__name__}: {e}")
+
+
+async def run_sender(session_factory, interval: float = SEND_INTERVAL) -> None:
+    """Pętla w tle (lifespan w main.py): pełne partie jedna za drugą, pusta kolejka – czekanie."""
+    global _wakeup
+    event = asyncio.Event()
+    _wakeup = (asyncio.get_running_loop(), event)
+    connection = SmtpConnection()
+    db = session_factory()
+    try:
+        await run_in_threadpool(_requeue, db)
+        while True:
+            try:
+                claimed = await run_in_threadpool(send_batch, db, connection)
+            except Exception as e:
+                db.rollback()
+                claimed = 0
+                print(f"[email] błąd: {type(e).__name__}: {e}")
+            if claimed >= SEND_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(event.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                await run_in_threadpool(_requeue, db)
+            event.clear()
+    finally:
+        _wakeup = None
+        await run_in_threadpool(connection.close)
+        db.close()
@@ -0,0 +1,99 @@
+# app/utils/media_paths.py
+"""
+Układ katalogów media/ z dwupoziomowym rozproszeniem (fan-out):
+
+    media/ab/cd/<nazwa>.<ext>            oryginały
+    media/thumbs/ab/cd/<nazwa>.jpg       miniatury
+    media/renditions/ab/cd/<nazwa>/      renditions
+    media/hls/ab/cd/<nazwa>/             HLS (wideo)
+
+"ab/cd" to pierwsze 4 znaki sha1 z nazwy pliku (bez rozszerzenia), więc
+w jednym katalogu ląduje średnio 1/65536 wszystkich plików niezależnie
+od tego, jak nazwy są zbudowane (sha256 treści, uuid).
+
+Każde miejsce, które zamienia ścieżkę z bazy na plik (upload, get_file,
+download_photo, stream_video, montowanie /media), przechodzi przez
+resolve() – w trakcie migracji (python -m app.manage shard-media) baza
+może jeszcze wskazywać płaską ścieżkę, a plik leżeć już w nowym miejscu.
+"""
+import hashlib
+from pathlib import Path
+
+from starlette.staticfiles import StaticFiles
+
+MEDIA_DIR = Path("media")
+THUMBS_DIR = MEDIA_DIR / "thumbs"
+RENDITIONS_DIR = MEDIA_DIR / "renditions"
+HLS_DIR = MEDIA_DIR / "hls"
+
+
+def shard(name: str) -> Path:
+    """'ab/cd' dla danej nazwy (liczone ze stem, rozszerzenie nie ma znaczenia)."""
+    digest = hashlib.sha1(Path(name).stem.encode()).hexdigest()
+    return Path(digest[:2]) / digest[2:4]
+
+
+def original_path(key: str, suffix: str) -> Path:
+    return MEDIA_DIR / shard(key) / f"{key}{suffix}"
+
+
+def thumb_path(key: str) -> Path:
+    return THUMBS_DIR / shard(key) / f"{key}.jpg"
+
+
+def renditions_dir(key: str) -> Path:
+    return RENDITIONS_DIR / shard(key) / key
+
+
+def hls_dir(key: str) -> Path:
+    return HLS_DIR / shard(key) / key
+
+
+def sharded(stored: str | Path) -> Path:
+    """Docelowe (rozproszone) miejsce dla ścieżki zapisanej w bazie."""
+    stored = Path(stored)
+    if stored.is_relative_to(THUMBS_DIR):
+        return THUMBS_DIR / shard(stored.name) / stored.name
+    if stored.is_relative_to(RENDITIONS_DIR):
+        # media/renditions/<stem>/<plik> -> media/renditions/ab/cd/<stem>/<plik>
+        rel = stored.relative_to(RENDITIONS_DIR)
+        if len(rel.parts) >= 4 and Path(*rel.parts[:2]) == shard(rel.parts[2]):
+            return stored
+        return RENDITIONS_DIR / shard(rel.parts[0]) / rel
+    return MEDIA_DIR / shard(stored.name) / stored.name
+
+
+def is_sharded(stored: str | Path) -> bool:
+    return Path(stored) == sharded(stored)
+
+
+def resolve(stored: str | None) -> Path | None:
+    """
+    Ścieżka z bazy -> istniejący plik. Najpierw dokładnie to, co zapisano,
+    potem rozproszony odpowiednik (plik przeniesiony, baza jeszcze nie).
+    Zwraca None, gdy pliku nie ma albo ścieżka wychodzi poza media/.
+    """
+    if not stored:
+        return None
+    path = Path(stored)
+    if not path.is_relative_to(MEDIA_DIR) or ".." in path.parts:
+        return None
+    for candidate in (path, sharded(path)):
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+class MediaStaticFiles(StaticFiles):
+    """
+    /media/... z fallbackiem na układ rozproszony – stare adresy typu
+    /media/<nazwa>.jpg czy /media/thumbs/<nazwa>.jpg nadal działają.
+    """
+
+    def lookup_path(self, path: str):
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result is None and path:
+            full_path, stat_result = super().lookup_path(
+                sharded(MEDIA_DIR / path).relative_to(MEDIA_DIR).as_posix()
+            )
+        return full_path, stat_result
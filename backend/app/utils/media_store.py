@@ -0,0 +1,233 @@
+# app/utils/media_store.py
+"""
+Magazyn oryginałów adresowany treścią (content-addressed).
+
+Nazwa pliku = sha256 zawartości (liczony strumieniowo w trakcie zapisu),
+więc ten sam plik wgrany dwa razy zajmuje miejsce raz i ma jedną
+miniaturę / jeden zestaw renditions. Tabela media_blobs trzyma licznik
+referencji – plik znika z dysku dopiero, gdy usunięto ostatnie zdjęcie,
+które go używa.
+
+MEDIA_CONTENT_ADDRESSED=0 wyłącza deduplikację (nazwy uuid, jak dawniej);
+licznik referencji działa wtedy tak samo, tylko zawsze wynosi 1.
+
+Plik trafia na miejsce jeszcze przed commitem wywołującego. Jeśli ten
+zrobi rollback, na dysku zostaje plik bez wiersza media_blobs – dlatego
+przed przeniesieniem zapisywany jest znacznik media_spool/<klucz>.blob,
+a sweep_unreferenced_blobs (sweeper w upload_gc) po BLOB_MARKER_GRACE
+usuwa pliki, dla których wiersz nie powstał.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy import text, bindparam
+from sqlalchemy.orm import Session
+
+from app.utils import media_paths
+from app.utils.chunk_store import SPOOL_DIR, discard
+from app.utils.jobs import enqueue_media_job
+from app.utils.thumbnails import VIDEO_SUFFIXES
+
+CONTENT_ADDRESSED = os.getenv("MEDIA_CONTENT_ADDRESSED", "1") == "1"
+COPY_BUFSIZE = 1024 * 1024
+BLOB_MARKER_SUFFIX = ".blob"
+BLOB_MARKER_GRACE = 3600       # s – dłużej żadna transakcja uploadu nie trwa
+
+
+@dataclass
+class StoredBlob:
+    file_path: Path
+    thumb_path: Path
+    renditions: list | None = None      # gotowe renditions istniejącej kopii (None = trzeba wygenerować)
+    hls_playlist: str | None = None     # gotowy HLS istniejącej kopii (wideo)
+
+    @property
+    def is_video(self) -> bool:
+        return self.file_path.suffix.lower() in VIDEO_SUFFIXES
+
+
+def write_stream(fileobj, bufsize: int = COPY_BUFSIZE) -> tuple[Path, str, int]:
+    """Kopiuje strumień do pliku tymczasowego, licząc sha256 w locie."""
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=SPOOL_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as out:
+        while True:
+            block = fileobj.read(bufsize)
+            if not block:
+                break
+            digest.update(block)
+            out.write(block)
+            size += len(block)
+        out.flush()
+        os.fsync(out.fileno())
+    return Path(tmp), digest.hexdigest(), size
+
+
+def hash_file(path: Path, bufsize: int = COPY_BUFSIZE) -> tuple[str, int]:
+    """sha256 pliku już leżącego na dysku (upload kawałkami – kolejność dowolna)."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while block := f.read(bufsize):
+            digest.update(block)
+            size += len(block)
+    return digest.hexdigest(), size
+
+
+def acquire_blob(db: Session, tmp_path: Path, sha256: str, size: int, suffix: str) -> StoredBlob:
+    """
+    Rejestruje referencję do pliku i przenosi go na miejsce (os.replace).
+    Wiersz media_blobs zostaje zablokowany do commitu, więc równoległe
+    release_blob tego samego pliku poczeka. Nie robi commit.
+    """
+    return acquire_blobs(db, [(tmp_path, sha256, size, suffix)])[0]
+
+
+def acquire_blobs(db: Session, items: list[tuple[Path, str, int, str]]) -> list[StoredBlob]:
+    """
+    acquire_blob dla wielu plików naraz: jeden INSERT ... ON DUPLICATE KEY
+    (executemany = jedno wielowierszowe zapytanie), jeden SELECT ścieżek
+    i jeden SELECT gotowych renditions. items = (tmp_path, sha256, size, suffix).
+    """
+    if not items:
+        return []
+    keys = [sha256 if CONTENT_ADDRESSED else uuid4().hex for _, sha256, _, _ in items]
+
+    db.execute(text("""
+        INSERT INTO media_blobs (content_key, file_path, size, refcount, created_at)
+        VALUES (:key, :path, :size, 1, NOW())
+        ON DUPLICATE KEY UPDATE refcount = refcount + 1
+    """), [
+        {"key": key, "path": str(media_paths.original_path(key, suffix)), "size": size}
+        for key, (_, _, size, suffix) in zip(keys, items)
+    ])
+
+    # ta sama treść mogła przyjść wcześniej z innym rozszerzeniem – obowiązuje pierwsze
+    stored = dict(db.execute(
+        text("SELECT content_key, file_path FROM media_blobs WHERE content_key IN :keys")
+        .bindparams(bindparam("keys", expanding=True)),
+        {"keys": sorted(set(keys))},
+    ).all())
+
+    # zawsze podmieniamy – identyczna treść, a plik na pewno istnieje po commicie;
+    # znacznik najpierw – po rollbacku sweeper wie, co sprzątnąć
+    for key, (tmp_path, _, _, _) in zip(keys, items):
+        file_path = Path(stored[key])
+        (SPOOL_DIR / f"{key}{BLOB_MARKER_SUFFIX}").write_text(str(file_path))
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, file_path)
+
+    ready = {}
+    for path, renditions, hls_playlist in db.execute(
+        text("""
+            SELECT file_path, renditions, hls_playlist FROM photos
+            WHERE file_path IN :paths AND media_status = 'ready'
+        """).bindparams(bindparam("paths", expanding=True)),
+        {"paths": sorted(set(stored.values()))},
+    ):
+        if isinstance(renditions, str):     # surowy SELECT zwraca JSON jako tekst
+            renditions = json.loads(renditions)
+        ready.setdefault(path, (renditions or [], hls_playlist))
+
+    blobs = []
+    for key in keys:
+        file_path = Path(stored[key])
+        thumb_path = media_paths.thumb_path(key)
+        blob = StoredBlob(file_path=file_path, thumb_path=thumb_path)
+        if str(file_path) in ready and media_paths.resolve(str(thumb_path)):
+            renditions, hls_playlist = ready[str(file_path)]
+            if not blob.is_video or hls_playlist:
+                blob.renditions, blob.hls_playlist = renditions, hls_playlist
+        blobs.append(blob)
+    return blobs
+
+
+def attach_derivatives(db: Session, photo_id: int, blob: StoredBlob) -> None:
+    """Podpina istniejące miniatury/renditions/HLS albo kolejkuje ich wygenerowanie."""
+    if blob.renditions is None:
+        enqueue_media_job(db, photo_id)
+        if blob.is_video:
+            enqueue_media_job(db, photo_id, kind="hls")
+        return
+    db.execute(
+        text("UPDATE photos SET renditions = :r, hls_playlist = :hls WHERE id = :pid"),
+        {"r": json.dumps(blob.renditions), "hls": blob.hls_playlist, "pid": photo_id},
+    )
+
+
+def release_blob(db: Session, file_path: str | None, thumb_path: str | None) -> None:
+    """
+    Zwalnia referencję zdjęcia do pliku. Przy ostatniej referencji usuwa
+    oryginał, miniaturę i renditions – jeszcze pod blokadą wiersza, więc
+    równoległy upload tej samej treści nie straci pliku. Nie robi commit.
+    """
+    if not file_path:
+        return
+
+    row = db.execute(text("""
+        SELECT content_key, refcount FROM media_blobs WHERE file_path = :path FOR UPDATE
+    """), {"path": file_path}).first()
+
+    if row is not None and row.refcount > 1:
+        db.execute(text("UPDATE media_blobs SET refcount = refcount - 1 WHERE content_key = :key"),
+                   {"key": row.content_key})
+        return
+
+    # ostatnia referencja albo plik sprzed media_blobs (płaski albo już rozproszony)
+    for p in (file_path, thumb_path):
+        if p and (path := media_paths.resolve(p)):
+            path.unlink(missing_ok=True)
+    stem = Path(file_path).stem
+    shutil.rmtree(media_paths.renditions_dir(stem), ignore_errors=True)
+    shutil.rmtree(media_paths.RENDITIONS_DIR / stem, ignore_errors=True)
+    shutil.rmtree(media_paths.hls_dir(stem), ignore_errors=True)
+    if row is not None:
+        db.execute(text("DELETE FROM media_blobs WHERE content_key = :key"), {"key": row.content_key})
+
+
+
+def sweep_unreferenced_blobs(db: Session, grace: int = BLOB_MARKER_GRACE) -> tuple[int, int]:
+    """
+    Znaczniki z acquire_blobs starsze niż grace: plik bez wiersza media_blobs
+    (transakcja uploadu zrobiła rollback) jest usuwany, znacznik zawsze.
+    SELECT ... FOR UPDATE czeka na niezatwierdzony INSERT tego samego klucza
+    i blokuje nowy do commit, więc równoległy upload tej treści nie straci
+    pliku. Zwraca (liczba usuniętych plików, bajty).
+    """
+    cutoff = time.time() - grace
+    markers = {}
+    with os.scandir(SPOOL_DIR) as entries:
+        for entry in entries:
+            if (entry.name.endswith(BLOB_MARKER_SUFFIX) and entry.is_file()
+                    and entry.stat().st_mtime < cutoff):
+                markers[entry.name.removesuffix(BLOB_MARKER_SUFFIX)] = SPOOL_DIR / entry.name
+    if not markers:
+        return 0, 0
+
+    referenced = {
+        key for (key,) in db.execute(
+            text("SELECT content_key FROM media_blobs WHERE content_key IN :keys FOR UPDATE")
+            .bindparams(bindparam("keys", expanding=True)),
+            {"keys": sorted(markers)},
+        )
+    }
+    files, freed = 0, 0
+    for key, marker in markers.items():
+        try:
+            stored = marker.read_text().strip()
+        except FileNotFoundError:
+            continue        # sprzątnął go sweeper innego procesu
+        if key not in referenced and (path := media_paths.resolve(stored)):
+            freed += discard(path)
+            files += 1
+        marker.unlink(missing_ok=True)
+    db.commit()
+    return files, freed
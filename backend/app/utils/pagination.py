@@ -0,0 +1,39 @@
+# app/utils/pagination.py
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 60
+MAX_PAGE_SIZE = 200
+
+
+# ─────────────────────────────────────────────
+# Kursor keyset: (tryb sortowania, wartość klucza, id)
+# ─────────────────────────────────────────────
+def encode_cursor(sort_by: str, value, photo_id: int) -> str:
+    """Zwraca nieprzezroczysty kursor wskazujący ostatni element strony."""
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    elif isinstance(value, Decimal):
+        value = {"dec": str(value)}     # bez float – wartość musi wrócić dokładnie
+    raw = json.dumps([sort_by, value, photo_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str):
+    """Odczytuje kursor i zwraca parę (wartość klucza, id)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        mode, value, photo_id = json.loads(base64.urlsafe_b64decode(padded))
+        if isinstance(value, dict):
+            value = Decimal(value["dec"]) if "dec" in value else datetime.fromisoformat(value["dt"])
+        photo_id = int(photo_id)
+    except (ValueError, TypeError, KeyError, ArithmeticError):
+        raise HTTPException(status_code=400, detail="Nieprawidłowy kursor")
+
+    if mode != sort_by:
+        raise HTTPException(status_code=400, detail="Kursor nie pasuje do sortowania")
+    return value, photo_id
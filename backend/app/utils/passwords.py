@@ -0,0 +1,126 @@
+# app/utils/passwords.py
+"""
+bcrypt (hash/verify) w osobnej, ograniczonej puli procesów.
+
+Jedno wywołanie to ~100–300 ms czystego CPU. W wątku requestu trzyma GIL
+i slot puli wątków, więc seria logowań głodzi resztę API. Tutaj:
+  * PASSWORD_WORKERS procesów liczy bcrypt równolegle, poza GIL-em API,
+  * naraz w puli (liczone + czekające) może być PASSWORD_QUEUE_LIMIT zadań –
+    kolejne dostają od razu 503 z Retry-After zamiast rosnącej kolejki
+    i timeoutów po stronie klienta.
+
+login jest async i czeka przez verify_password_async() bez zajmowania wątku;
+rzadkie ścieżki (rejestracja, zmiana/reset hasła) używają wersji blokujących.
+Gdy proces puli zginie (OOM, segfault), ProcessPoolExecutor jest już na
+zawsze zepsuty – pula jest wtedy odrzucana i zadanie ponawiane raz na nowej.
+
+Procesy startują przez forkserver (spawn, gdzie go nie ma), a nie fork:
+fork z wielowątkowego serwera kopiuje też blokady trzymane w tej chwili
+przez inne wątki (logging, pula połączeń bazy) i dziecko może na nich
+zawisnąć.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", str(PASSWORD_WORKERS * 8)))
+RETRY_AFTER = 1     # s
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_mp_context = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_QUEUE_LIMIT)
+
+
+# ---------- funkcje wykonywane w procesach puli ----------
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed: str) -> bool:
+    return pwd_context.verify(password, hashed)
+
+
+# ---------- pula ----------
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS, mp_context=_mp_context)
+        return _pool
+
+
+def _discard(pool: ProcessPoolExecutor) -> None:
+    """Odrzuca zepsutą pulę; następne _get_pool() tworzy nową."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _submit(fn, *args) -> Future:
+    """Zadanie do puli albo 503, gdy kolejka jest pełna."""
+    if not _slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Serwer jest przeciążony, spróbuj ponownie za chwilę.",
+            headers={"Retry-After": str(RETRY_AFTER)},
+        )
+    try:
+        pool = _get_pool()
+        try:
+            future = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            _discard(pool)
+            future = _get_pool().submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+# BrokenProcessPool z wyniku: proces zginął w trakcie tego zadania – drugie
+# _submit trafi na zepsutą pulę, odrzuci ją i wyśle zadanie do nowej
+
+def hash_password(password: str) -> str:
+    try:
+        return _submit(_hash, password).result()
+    except BrokenProcessPool:
+        return _submit(_hash, password).result()
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    try:
+        return _submit(_verify, password, hashed).result()
+    except BrokenProcessPool:
+        return _submit(_verify, password, hashed).result()
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    try:
+        return await asyncio.wrap_future(_submit(_verify, password, hashed))
+    except BrokenProcessPool:
+        return await asyncio.wrap_future(_submit(_verify, password, hashed))
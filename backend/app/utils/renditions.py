@@ -0,0 +1,82 @@
+# app/utils/renditions.py
+"""
+Zestaw rozmiarów (renditions) zdjęcia z jednego dekodowania oryginału:
+JPEG + WebP (+ AVIF, jeśli Pillow ma wsparcie) dla każdej szerokości
+z RENDITION_WIDTHS. Klient wybiera najmniejszy wystarczający plik.
+"""
+from pathlib import Path
+
+from PIL import Image, ImageOps, features
+
+from app.utils.media_paths import renditions_dir
+
+RENDITION_WIDTHS = (320, 640, 1280, 1920)
+THUMB_WIDTH = RENDITION_WIDTHS[0]
+THUMB_SIZE = (THUMB_WIDTH, THUMB_WIDTH)     # media/thumbs/ab/cd/<id>.jpg – mieści się w kwadracie
+
+FORMATS = {
+    # format: (rozszerzenie, opcje zapisu)
+    "jpeg": ("jpg", {"quality": 82, "optimize": True, "progressive": True}),
+    "webp": ("webp", {"quality": 80, "method": 4}),
+    "avif": ("avif", {"quality": 60}),
+}
+
+
+def available_formats() -> list[str]:
+    return [fmt for fmt in FORMATS if fmt == "jpeg" or features.check(fmt)]
+
+
+def _decode(src: Path, max_width: int) -> Image.Image:
+    """
+    Jedno dekodowanie źródła. Dla JPEG draft() każe dekoderowi od razu
+    zmniejszyć obraz (skala 1/2, 1/4, 1/8) – nie mniej niż max_width.
+    """
+    with Image.open(src) as im:
+        if im.format == "JPEG":
+            im.draft("RGB", (max_width, max_width))
+        # exif_transpose zwraca nową, wczytaną kopię – plik można zamknąć
+        im = ImageOps.exif_transpose(im)
+    if im.mode != "RGB":
+        im = im.convert("RGB")
+    return im
+
+
+def render_renditions(src: Path, thumb_dst: Path, out_dir: Path | None = None) -> list[dict]:
+    """
+    Tworzy renditions w out_dir (domyślnie media/renditions/ab/cd/<stem>/) oraz
+    klasyczną miniaturę thumb_dst. Zwraca listę do zapisania w photos.renditions.
+    Nie powiększa – szerokości większe od oryginału są pomijane (zostaje
+    co najmniej jedna, w rozmiarze oryginału).
+    """
+    src, thumb_dst = Path(src), Path(thumb_dst)
+    out_dir = Path(out_dir) if out_dir else renditions_dir(src.stem)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    thumb_dst.parent.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(src) as probe:          # tylko nagłówek, bez dekodowania
+        original_width = probe.width
+        if probe.getexif().get(0x0112) in (5, 6, 7, 8):    # obrót o 90° w EXIF
+            original_width = probe.height
+    widths = [w for w in RENDITION_WIDTHS if w < original_width] or [original_width]
+
+    formats = available_formats()
+    result = []
+    with _decode(src, max(widths)) as base:
+        # od największej do najmniejszej – każda kolejna liczona z poprzedniej
+        current = base
+        for width in sorted(widths, reverse=True):
+            height = max(1, round(current.height * width / current.width))
+            if (width, height) != current.size:
+                current = current.resize((width, height), Image.LANCZOS, reducing_gap=2.0)
+            for fmt in formats:
+                ext, options = FORMATS[fmt]
+                dst = out_dir / f"{width}.{ext}"
+                current.save(dst, fmt.upper(), **options)
+                result.append({"width": width, "height": height, "format": fmt, "path": dst.as_posix()})
+            if width == min(widths):
+                # pionowe zdjęcie ma przy tej szerokości dużo większą wysokość
+                thumb = current.copy()
+                thumb.thumbnail(THUMB_SIZE)
+                thumb.save(thumb_dst, "JPEG", **FORMATS["jpeg"][1])
+
+    return sorted(result, key=lambda r: (r["width"], r["format"]))
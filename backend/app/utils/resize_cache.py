@@ -0,0 +1,176 @@
+# app/utils/resize_cache.py
+"""
+Pochodne zdjęć w dowolnym rozmiarze, liczone przy pierwszym żądaniu
+(GET /media/resize/{photo_id}?w=&h=&fmt=) i trzymane w dyskowym cache LRU.
+
+    media_cache/ab/<klucz>.<ext>
+
+Żądane w/h zaokrąglane są w górę do SIZE_BUCKETS – inaczej każda para
+liczb byłaby osobnym plikiem i osobnym dekodowaniem oryginału, a cache
+dałoby się zapchać, licząc w=1..4096.
+
+Limit RESIZE_CACHE_MAX_BYTES – po przekroczeniu usuwane są najdawniej
+używane pliki. Kolejność LRU trzyma indeks w pamięci; przy starcie
+odtwarzany jest z mtime plików (trafienie podbija mtime), więc przeżywa
+restart; skan katalogu idzie poza blokadą, żeby nie wstrzymywać trafień.
+Kilka procesów może dzielić katalog: plik usunięty przez inny proces
+to po prostu chybienie.
+
+Single-flight: równoczesne chybienia tej samej pochodnej w procesie
+czekają na jedną blokadę – oryginał dekodowany jest raz, reszta dostaje
+gotowy plik. Zapis przez plik tymczasowy + os.replace, więc nikt nie
+zobaczy połowy obrazu.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import Image
+
+from app.utils.renditions import FORMATS, RENDITION_WIDTHS, _decode
+
+RESIZE_CACHE_DIR = Path(os.getenv("RESIZE_CACHE_DIR", "media_cache"))
+RESIZE_CACHE_MAX_BYTES = int(os.getenv("RESIZE_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+MAX_DIMENSION = 4096
+SIZE_BUCKETS = (*RENDITION_WIDTHS, 2560, MAX_DIMENSION)
+
+
+def snap(size: int | None) -> int | None:
+    """Najmniejszy kubełek nie mniejszy niż size (None zostaje None)."""
+    if size is None:
+        return None
+    return next((b for b in SIZE_BUCKETS if b >= size), MAX_DIMENSION)
+
+
+class ResizeCache:
+    def __init__(self, root: Path = RESIZE_CACHE_DIR, max_bytes: int = RESIZE_CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._index: OrderedDict[Path, int] | None = None     # ścieżka -> rozmiar, od najstarszej
+        self._lock = threading.Lock()
+        self._inflight: dict[Path, list] = {}                  # ścieżka -> [blokada, liczba czekających]
+
+    def path_for(self, source: str, width: int | None, height: int | None, fmt: str) -> Path:
+        key = hashlib.sha1(f"{source}:{width or 0}x{height or 0}:{fmt}".encode()).hexdigest()
+        return self.root / key[:2] / f"{key}.{FORMATS[fmt][0]}"
+
+    # ---------- indeks LRU ----------
+
+    def _scan(self) -> OrderedDict[Path, int]:
+        entries = []
+        if self.root.is_dir():
+            for path in self.root.glob("*/*"):
+                if path.name.startswith("."):
+                    continue
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, path, st.st_size))
+        entries.sort()
+        return OrderedDict((path, size) for _, path, size in entries)
+
+    def _ensure_index(self) -> None:
+        """Pierwsze użycie: skan bez blokady (równoległe skany – wygrywa pierwszy)."""
+        if self._index is not None:
+            return
+        index = self._scan()
+        with self._lock:
+            if self._index is None:
+                self._index = index
+                self.total_bytes = sum(index.values())
+
+    def _touch(self, path: Path) -> bool:
+        """Trafienie: podbija pozycję w LRU. False, gdy pliku już nie ma."""
+        self._ensure_index()
+        with self._lock:
+            try:
+                os.utime(path)
+                size = path.stat().st_size
+            except FileNotFoundError:
+                self.total_bytes -= self._index.pop(path, 0)
+                return False
+            if path not in self._index:
+                self.total_bytes += size
+            self._index[path] = size
+            self._index.move_to_end(path)
+            return True
+
+    def _add(self, path: Path, size: int) -> None:
+        self._ensure_index()
+        with self._lock:
+            self.total_bytes += size - self._index.get(path, 0)
+            self._index[path] = size
+            self._index.move_to_end(path)
+            while self.total_bytes > self.max_bytes and len(self._index) > 1:
+                old, old_size = self._index.popitem(last=False)
+                self.total_bytes -= old_size
+                old.unlink(missing_ok=True)
+
+    # ---------- single-flight ----------
+
+    def get_or_render(self, src: Path, source_key: str, width: int | None, height: int | None,
+                      fmt: str) -> Path:
+        """Ścieżka gotowej pochodnej; liczy ją, jeśli jej nie ma (jeden raz na klucz)."""
+        width, height = snap(width), snap(height)
+        dst = self.path_for(source_key, width, height, fmt)
+        if self._touch(dst):
+            return dst
+
+        with self._lock:
+            slot = self._inflight.setdefault(dst, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                if self._touch(dst):            # policzył ją ktoś, na kogo czekaliśmy
+                    return dst
+                size = render(src, dst, width, height, fmt)
+                self._add(dst, size)
+                return dst
+        finally:
+            with self._lock:
+                slot[1] -= 1
+                if slot[1] == 0:
+                    del self._inflight[dst]
+
+
+def fit(original: tuple[int, int], width: int | None, height: int | None) -> tuple[int, int]:
+    """Rozmiar mieszczący się w (width, height) z zachowaniem proporcji, bez powiększania."""
+    ow, oh = original
+    scale = min(
+        (width or MAX_DIMENSION) / ow,
+        (height or MAX_DIMENSION) / oh,
+        MAX_DIMENSION / max(ow, oh),
+        1.0,
+    )
+    return max(1, round(ow * scale)), max(1, round(oh * scale))
+
+
+def render(src: Path, dst: Path, width: int | None, height: int | None, fmt: str) -> int:
+    """Jedno dekodowanie (z draft() dla JPEG) i zapis atomowy. Zwraca rozmiar pliku."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    ext, options = FORMATS[fmt]
+    with Image.open(src) as probe:          # tylko nagłówek
+        original = probe.size
+        if probe.getexif().get(0x0112) in (5, 6, 7, 8):    # obrót o 90° w EXIF
+            original = original[::-1]
+    width, height = fit(original, width, height)
+    with _decode(src, max(width, height)) as im:
+        if im.size != (width, height):
+            im = im.resize((width, height), Image.LANCZOS, reducing_gap=2.0)
+        fd, tmp = tempfile.mkstemp(dir=dst.parent, prefix=".", suffix=f".{ext}")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                im.save(f, fmt.upper(), **options)
+            os.replace(tmp, dst)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+    return dst.stat().st_size
+
+
+resize_cache = ResizeCache()
@@ -0,0 +1,52 @@
+# app/utils/search.py
+import re
+
+# polskie znaki diakrytyczne → ASCII (po LOWER, więc tylko małe litery)
+POLISH_FOLD = {
+    "ą": "a", "ć": "c", "ę": "e", "ł": "l", "ń": "n",
+    "ó": "o", "ś": "s", "ź": "z", "ż": "z",
+}
+
+# innodb_ft_min_token_size (domyślnie 3) – krótsze słowa nie trafiają do indeksu
+MIN_TOKEN_LEN = 3
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fold_text(value: str) -> str:
+    """Małe litery + usunięcie polskich znaków (tak samo jak kolumna search_text)."""
+    value = value.lower()
+    for src, dst in POLISH_FOLD.items():
+        value = value.replace(src, dst)
+    return value
+
+
+def search_text_sql() -> str:
+    """Wyrażenie SQL kolumny generowanej photos.search_text."""
+    expr = "LOWER(CONCAT_WS(' ', title, description))"
+    for src, dst in POLISH_FOLD.items():
+        expr = f"REPLACE({expr}, '{src}', '{dst}')"
+    return expr
+
+
+def like_pattern(q: str) -> str:
+    """%fraza% dla LIKE ... ESCAPE '\\' – %, _ i \\ z frazy są dosłowne."""
+    escaped = fold_text(q).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def tokenize(q: str) -> list[str]:
+    return _TOKEN_RE.findall(fold_text(q))
+
+
+def build_boolean_query(q: str) -> str | None:
+    """
+    Zamienia frazę użytkownika na zapytanie FULLTEXT w trybie BOOLEAN:
+    każde słowo wymagane, ostatnie jako prefiks (wyszukiwanie w trakcie pisania).
+    Zwraca None, gdy żadne słowo nie nadaje się do indeksu.
+    """
+    tokens = [t for t in tokenize(q) if len(t) >= MIN_TOKEN_LEN]
+    if not tokens:
+        return None
+    terms = [f"+{t}" for t in tokens[:-1]] + [f"+{tokens[-1]}*"]
+    return " ".join(terms)
@@ -0,0 +1,50 @@
+# app/utils/signed_urls.py
+"""
+Podpisane, wygasające adresy plików z media/ (HMAC-SHA256).
+
+Uprawnienia sprawdza się raz, przy wydaniu adresu (GET /photos/download/{id}/link);
+GET /media/signed/... weryfikuje tylko podpis i czas – bez bazy i bez JWT,
+więc może go obsłużyć dowolna instancja API albo CDN przed nią.
+
+Termin ważności jest zaokrąglany w górę do SIGNED_URL_BUCKET sekund:
+kolejne wydania w tym oknie dają ten sam adres, a więc trafienie w cache.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import time
+from urllib.parse import quote, urlencode
+
+from app.security import SECRET_KEY
+
+MEDIA_URL_SECRET = os.getenv("MEDIA_URL_SECRET", SECRET_KEY).encode()
+SIGNED_URL_TTL = int(os.getenv("SIGNED_URL_TTL", "3600"))        # s
+SIGNED_URL_BUCKET = 300                                          # s
+SIGNED_PREFIX = "/media/signed/"
+
+
+def _signature(rel_path: str, exp: int, filename: str) -> str:
+    msg = f"{rel_path}\n{exp}\n{filename}".encode()
+    digest = hmac.new(MEDIA_URL_SECRET, msg, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def expiry(ttl: int = SIGNED_URL_TTL, now: float | None = None) -> int:
+    exp = int(now if now is not None else time.time()) + ttl
+    return -(-exp // SIGNED_URL_BUCKET) * SIGNED_URL_BUCKET
+
+
+def sign(rel_path: str, filename: str = "", ttl: int = SIGNED_URL_TTL) -> tuple[str, int]:
+    """rel_path względem media/ -> (adres względny z ?exp=&sig=, termin ważności)."""
+    exp = expiry(ttl)
+    query = {"exp": exp, "sig": _signature(rel_path, exp, filename)}
+    if filename:
+        query["name"] = filename
+    return f"{SIGNED_PREFIX}{quote(rel_path)}?{urlencode(query)}", exp
+
+
+def verify(rel_path: str, exp: int, sig: str, filename: str = "") -> bool:
+    if exp < time.time():
+        return False
+    return hmac.compare_digest(sig, _signature(rel_path, exp, filename))
@@ -3,7 +3,7 @@ from pathlib import Path
 from PIL import Image               # pillow
 import subprocess                   # ffmpeg do wideo
 
-THUMB_SIZE = (400, 400)             # możesz zmienić
+from app.utils.renditions import THUMB_SIZE, render_renditions     # jeden rozmiar dla całej aplikacji
 
 # ─────────────────────────────────────────────
 # 1️⃣  miniatura zdjęcia
@@ -37,3 +37,26 @@ def create_video_thumb(src: Path, dst: Path) -> None:
     except FileNotFoundError:
         # ffmpeg nie zainstalowany – zostaw pustą miniaturę
         pass
+
+
+# ─────────────────────────────────────────────
+# 3️⃣  miniatura dla dowolnego pliku (worker kolejki)
+# ─────────────────────────────────────────────
+VIDEO_SUFFIXES = {".mp4", ".mov", ".mkv"}
+
+
+def render_thumbnail(src: Path, dst: Path) -> list[dict]:
+    """
+    Miniatura + (dla zdjęć) pełny zestaw renditions z jednego dekodowania.
+    Błąd (również brak ffmpeg) kończy się wyjątkiem – worker ponowi próbę.
+    Zwraca listę renditions do zapisania w photos.renditions.
+    """
+    src, dst = Path(src), Path(dst)
+    renditions = []
+    if src.suffix.lower() in VIDEO_SUFFIXES:
+        create_video_thumb(src, dst)
+    else:
+        renditions = render_renditions(src, dst)
+    if not dst.exists():
+        raise RuntimeError(f"Nie powstała miniatura {dst}")
+    return renditions
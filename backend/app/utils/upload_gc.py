@@ -0,0 +1,147 @@
+# app/utils/upload_gc.py
+"""
+Sprzątanie porzuconych sesji uploadu kawałkami.
+
+Sesja wygasa UPLOAD_SESSION_TTL sekund po ostatniej aktywności (start-upload
+albo upload-chunk). Sweeper (uruchamiany cyklicznie w main.py) kasuje pliki
+robocze wygasłych sesji i ich wiersze partiami po SWEEP_BATCH_SIZE, a także
+osierocone pliki w media_spool/ (np. po przerwanym uploadzie wsadowym)
+i oryginały w media/ po uploadzie wycofanym rollbackiem
+(media_store.sweep_unreferenced_blobs).
+
+Liczniki w UPLOAD_GC_METRICS są per proces – wystawia je
+GET /photos/upload-sessions/metrics.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text, bindparam
+from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+
+from app.utils import chunk_store, media_store
+
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))     # s
+SWEEP_INTERVAL = int(os.getenv("UPLOAD_SWEEP_INTERVAL", "600"))             # s
+SWEEP_BATCH_SIZE = 500
+
+UPLOAD_GC_METRICS = {
+    "runs": 0,
+    "sessions_reclaimed": 0,
+    "bytes_reclaimed": 0,
+    "orphan_files_reclaimed": 0,
+    "orphan_blobs_reclaimed": 0,
+    "last_run_at": None,
+    "last_run_seconds": None,
+    "last_error": None,
+}
+
+
+def expiry_cutoff(ttl: int = UPLOAD_SESSION_TTL) -> datetime:
+    return datetime.utcnow() - timedelta(seconds=ttl)
+
+
+def is_expired(last_activity_at: datetime | None, ttl: int = UPLOAD_SESSION_TTL) -> bool:
+    return last_activity_at is not None and last_activity_at < expiry_cutoff(ttl)
+
+
+def sweep_expired_sessions(db: Session, ttl: int = UPLOAD_SESSION_TTL,
+                           batch_size: int = SWEEP_BATCH_SIZE) -> tuple[int, int]:
+    """Usuwa wygasłe sesje partiami. Zwraca (liczba sesji, zwolnione bajty)."""
+    cutoff = expiry_cutoff(ttl)
+    sessions, freed = 0, 0
+    while True:
+        # SKIP LOCKED – kilka procesów API może sprzątać jednocześnie
+        rows = db.execute(text("""
+            SELECT id, spool_path FROM upload_sessions
+            WHERE last_activity_at < :cutoff
+            ORDER BY id
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        """), {"cutoff": cutoff, "limit": batch_size}).all()
+        if not rows:
+            db.commit()
+            return sessions, freed
+
+        ids = [r.id for r in rows]
+        for r in rows:
+            if r.spool_path:
+                freed += chunk_store.discard(chunk_store.SPOOL_DIR / os.path.basename(r.spool_path))
+        db.execute(text("DELETE FROM upload_chunks WHERE upload_session_id IN :ids")
+                   .bindparams(bindparam("ids", expanding=True)), {"ids": ids})
+        db.execute(text("DELETE FROM upload_sessions WHERE id IN :ids")
+                   .bindparams(bindparam("ids", expanding=True)), {"ids": ids})
+        db.commit()
+        sessions += len(ids)
+
+
+def sweep_orphan_spool_files(db: Session, ttl: int = UPLOAD_SESSION_TTL) -> tuple[int, int]:
+    """
+    Pliki w media_spool/ starsze niż TTL, do których nie prowadzi żadna sesja
+    (.part po ręcznie skasowanym wierszu, .tmp po przerwanym uploadzie).
+    """
+    cutoff = time.time() - ttl
+    candidates = {}
+    with os.scandir(chunk_store.SPOOL_DIR) as entries:
+        for entry in entries:
+            if entry.name.endswith(media_store.BLOB_MARKER_SUFFIX):
+                continue        # znaczniki sprząta sweep_unreferenced_blobs
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                candidates[str(chunk_store.SPOOL_DIR / entry.name)] = entry.name
+    if not candidates:
+        return 0, 0
+
+    in_use = {
+        os.path.basename(p) for (p,) in db.execute(
+            text("SELECT spool_path FROM upload_sessions WHERE spool_path IN :paths")
+            .bindparams(bindparam("paths", expanding=True)),
+            {"paths": list(candidates)},
+        )
+    }
+    db.rollback()
+
+    files, freed = 0, 0
+    for name in candidates.values():
+        if name not in in_use:
+            freed += chunk_store.discard(chunk_store.SPOOL_DIR / name)
+            files += 1
+    return files, freed
+
+
+def sweep_uploads(db: Session, ttl: int = UPLOAD_SESSION_TTL) -> dict:
+    """Jeden przebieg sweepera; aktualizuje UPLOAD_GC_METRICS."""
+    start = time.perf_counter()
+    sessions, freed = sweep_expired_sessions(db, ttl)
+    orphans, orphan_bytes = sweep_orphan_spool_files(db, ttl)
+    blobs, blob_bytes = media_store.sweep_unreferenced_blobs(db)
+
+    UPLOAD_GC_METRICS["runs"] += 1
+    UPLOAD_GC_METRICS["sessions_reclaimed"] += sessions
+    UPLOAD_GC_METRICS["bytes_reclaimed"] += freed + orphan_bytes + blob_bytes
+    UPLOAD_GC_METRICS["orphan_files_reclaimed"] += orphans
+    UPLOAD_GC_METRICS["orphan_blobs_reclaimed"] += blobs
+    UPLOAD_GC_METRICS["last_run_at"] = datetime.utcnow().isoformat()
+    UPLOAD_GC_METRICS["last_run_seconds"] = round(time.perf_counter() - start, 3)
+    UPLOAD_GC_METRICS["last_error"] = None
+    return {"sessions": sessions, "orphan_files": orphans, "orphan_blobs": blobs,
+            "bytes": freed + orphan_bytes + blob_bytes}
+
+
+async def run_sweeper(session_factory, interval: int = SWEEP_INTERVAL) -> None:
+    """Pętla w tle (lifespan w main.py): przebieg co `interval` sekund, błąd nie zatrzymuje pętli."""
+    while True:
+        db = session_factory()
+        try:
+            result = await run_in_threadpool(sweep_uploads, db)
+            if result["sessions"] or result["orphan_files"] or result["orphan_blobs"]:
+                print(f"[upload-gc] usunięto {result['sessions']} sesji, "
+                      f"{result['orphan_files']} plików, {result['orphan_blobs']} oryginałów, "
+                      f"{result['bytes']} B")
+        except Exception as e:
+            UPLOAD_GC_METRICS["last_error"] = f"{type(e).__name__}: {e}"[:1024]
+            print(f"[upload-gc] błąd: {UPLOAD_GC_METRICS['last_error']}")
+        finally:
+            db.close()
+        await asyncio.sleep(interval)
@@ -0,0 +1,61 @@
+# app/utils/zipstream.py
+"""
+Archiwum ZIP generowane w locie, bez kompresji (ZIP_STORED – zdjęcia
+i wideo i tak są skompresowane) i bez plików tymczasowych.
+
+zipfile pisze do ujścia bez seek(), więc sam przechodzi na tryb
+strumieniowy: CRC i rozmiary trafiają do deskryptora za danymi,
+a ZIP64 włącza się automatycznie dla plików/archiwów > 4 GB.
+W pamięci jest naraz najwyżej jeden kawałek READ_CHUNK.
+"""
+import re
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator
+
+READ_CHUNK = 1024 * 1024
+
+
+class _Sink:
+    """Ujście dla ZipFile: zbiera zapisane bajty do oddania przez generator."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._buf += data
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buf)
+        self._buf.clear()
+        return data
+
+
+def safe_name(title: str | None, fallback: str) -> str:
+    """Nazwa pliku w archiwum – bez separatorów katalogów i znaków sterujących."""
+    name = re.sub(r'[\x00-\x1f/\\:*?"<>|]+', "_", (title or "").strip()).strip(". ")
+    return name[:120] or fallback
+
+
+def stream_zip(entries: Iterable[tuple[str, Path]]) -> Iterator[bytes]:
+    """entries = (nazwa w archiwum, ścieżka na dysku); zwraca kolejne kawałki archiwum."""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for arcname, path in entries:
+            zinfo = zipfile.ZipInfo.from_file(path, arcname)
+            zinfo.compress_type = zipfile.ZIP_STORED
+            with open(path, "rb") as src, zf.open(zinfo, "w") as dst:
+                while chunk := src.read(READ_CHUNK):
+                    dst.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()          # katalog centralny
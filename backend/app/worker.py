@@ -0,0 +1,181 @@
+# app/worker.py
+"""
+Worker kolejki media_jobs (miniatury i HLS generowane poza requestem).
+
+Uruchomienie z katalogu backend:
+    python -m app.worker --processes 4
+
+Proces główny pobiera zadania z bazy (SELECT ... FOR UPDATE SKIP LOCKED,
+więc można uruchomić kilka workerów naraz) i przekazuje je do puli
+procesów. W locie jest najwyżej --processes zadań; nieudane wracają do
+kolejki z wykładniczym opóźnieniem, po max_attempts zdjęcie dostaje
+media_status = 'failed'.
+
+Zadania w toku dostają co HEARTBEAT_INTERVAL świeże locked_at, więc
+requeue_stale w innym workerze oddaje do kolejki tylko zadania workera,
+który przestał żyć – nie długie kodowanie HLS, które wciąż trwa.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from sqlalchemy import text, bindparam
+
+from app.database import SessionLocal
+from app.utils import media_paths
+from app.utils.thumbnails import render_thumbnail
+from app.utils.hls import package_hls
+
+POLL_INTERVAL = 2.0          # s – gdy kolejka jest pusta
+HEARTBEAT_INTERVAL = 30      # s – odświeżanie locked_at zadań w toku
+STALE_AFTER = 300            # s – 'running' bez heartbeatu = worker padł, zadanie wraca do kolejki
+BACKOFF_BASE = 10            # s – 10, 20, 40, ...
+
+
+def thumbnail_job(job: dict) -> list[dict]:
+    # w trakcie shard-media plik mógł już zmienić katalog
+    src = media_paths.resolve(job["file_path"]) or job["file_path"]
+    return render_thumbnail(src, job["thumb_path"])
+
+
+def hls_job(job: dict) -> str:
+    src = media_paths.resolve(job["file_path"]) or job["file_path"]
+    return package_hls(src, media_paths.hls_dir(Path(job["file_path"]).stem))
+
+
+JOB_HANDLERS = {
+    "thumbnail": thumbnail_job,
+    "hls": hls_job,
+}
+
+
+def run_job(job: dict):
+    """Wykonywane w procesie potomnym; wynik trafia do job_succeeded."""
+    return JOB_HANDLERS[job["kind"]](job)
+
+
+def requeue_stale(db) -> None:
+    db.execute(text("""
+        UPDATE media_jobs SET status = 'pending', locked_at = NULL
+        WHERE status = 'running' AND locked_at < NOW() - INTERVAL :stale SECOND
+    """), {"stale": STALE_AFTER})
+    db.commit()
+
+
+def heartbeat(db, job_ids: list[int]) -> None:
+    """Świeże locked_at dla zadań, które ten worker nadal wykonuje."""
+    if not job_ids:
+        return
+    db.execute(text("""
+        UPDATE media_jobs SET locked_at = NOW()
+        WHERE status = 'running' AND id IN :ids
+    """).bindparams(bindparam("ids", expanding=True)), {"ids": job_ids})
+    db.commit()
+
+
+def claim_jobs(db, limit: int) -> list[dict]:
+    """Rezerwuje do `limit` zadań gotowych do uruchomienia."""
+    rows = db.execute(text("""
+        SELECT j.id, j.kind, j.photo_id, j.attempts, j.max_attempts, p.file_path, p.thumb_path
+        FROM media_jobs j
+        JOIN photos p ON p.id = j.photo_id
+        WHERE j.status = 'pending' AND j.run_after <= NOW()
+        ORDER BY j.id
+        LIMIT :limit
+        FOR UPDATE OF j SKIP LOCKED
+    """), {"limit": limit}).mappings().all()
+    if rows:
+        db.execute(text("""
+            UPDATE media_jobs
+               SET status = 'running', locked_at = NOW(), attempts = attempts + 1
+             WHERE id IN :ids
+        """).bindparams(bindparam("ids", expanding=True)), {"ids": [r["id"] for r in rows]})
+    db.commit()
+    return [dict(r, attempts=r["attempts"] + 1) for r in rows]
+
+
+def job_succeeded(db, job: dict, result) -> None:
+    db.execute(text("DELETE FROM media_jobs WHERE id = :id"), {"id": job["id"]})
+    if job["kind"] == "thumbnail" and result:
+        db.execute(text("UPDATE photos SET renditions = :r WHERE id = :pid"),
+                   {"r": json.dumps(result), "pid": job["photo_id"]})
+    elif job["kind"] == "hls":
+        db.execute(text("UPDATE photos SET hls_playlist = :p WHERE id = :pid"),
+                   {"p": result, "pid": job["photo_id"]})
+    db.execute(text("""
+        UPDATE photos SET media_status = 'ready'
+        WHERE id = :pid
+          AND NOT EXISTS (SELECT 1 FROM media_jobs WHERE photo_id = :pid AND id <> :id)
+    """), {"pid": job["photo_id"], "id": job["id"]})
+    db.commit()
+
+
+def job_failed(db, job: dict, error: Exception) -> None:
+    message = f"{type(error).__name__}: {error}"[:1024]
+    if job["attempts"] >= job["max_attempts"]:
+        db.execute(text("""
+            UPDATE media_jobs SET status = 'failed', last_error = :err, locked_at = NULL WHERE id = :id
+        """), {"id": job["id"], "err": message})
+        db.execute(text("UPDATE photos SET media_status = 'failed' WHERE id = :pid"),
+                   {"pid": job["photo_id"]})
+    else:
+        delay = BACKOFF_BASE * 2 ** (job["attempts"] - 1)
+        db.execute(text("""
+            UPDATE media_jobs
+               SET status = 'pending', last_error = :err, locked_at = NULL,
+                   run_after = NOW() + INTERVAL :delay SECOND
+             WHERE id = :id
+        """), {"id": job["id"], "err": message, "delay": delay})
+    db.commit()
+    print(f"[worker] zadanie {job['id']} ({job['kind']}, zdjęcie {job['photo_id']}) "
+          f"próba {job['attempts']}/{job['max_attempts']} nieudana: {message}")
+
+
+def run(processes: int, once: bool = False) -> None:
+    db = SessionLocal()
+    try:
+        requeue_stale(db)
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            in_flight = {}
+            last_beat = time.monotonic()
+            while True:
+                free = processes - len(in_flight)
+                if free > 0:
+                    for job in claim_jobs(db, free):
+                        in_flight[pool.submit(run_job, job)] = job
+
+                if not in_flight:
+                    if once:
+                        return
+                    time.sleep(POLL_INTERVAL)
+                    requeue_stale(db)
+                    continue
+
+                done, _ = wait(in_flight, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = in_flight.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        job_succeeded(db, job, future.result())
+                    else:
+                        job_failed(db, job, error)
+
+                if time.monotonic() - last_beat >= HEARTBEAT_INTERVAL:
+                    heartbeat(db, [job["id"] for job in in_flight.values()])
+                    last_beat = time.monotonic()
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.worker")
+    parser.add_argument("--processes", type=int, default=2, help="liczba procesów roboczych")
+    parser.add_argument("--once", action="store_true", help="opróżnij kolejkę i zakończ")
+    args = parser.parse_args()
+    run(args.processes, once=args.once)
+
+
+if __name__ == "__main__":
+    main()
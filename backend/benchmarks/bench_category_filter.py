@@ -0,0 +1,61 @@
+# benchmarks/bench_category_filter.py
+"""
+Porównanie filtrowania po kategoriach: łańcuch JOIN-ów (poprzednia wersja
+list_photos) vs. jedno GROUP BY ... HAVING COUNT(DISTINCT) = N.
+
+Uruchomienie (z katalogu backend, przy działającej bazie):
+    python -m benchmarks.bench_category_filter 2 4 6
+"""
+import sys
+import time
+import random
+
+from sqlalchemy.orm import aliased
+
+from app import models
+from app.database import SessionLocal
+from app.routers.photos import photos_in_all_categories
+
+REPEAT = 20
+
+
+def join_chain(db, category_ids):
+    query = db.query(models.Photo.id)
+    for i, cat_id in enumerate(category_ids):
+        alias = aliased(models.PhotoCategory, name=f"pc_{i}")
+        query = query.join(alias, alias.photo_id == models.Photo.id)
+        query = query.filter(alias.category_id == cat_id)
+    return query
+
+
+def group_having(db, category_ids):
+    return db.query(models.Photo.id).filter(
+        models.Photo.id.in_(photos_in_all_categories(db, category_ids))
+    )
+
+
+def measure(build, db, category_ids):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        ids = {r[0] for r in build(db, category_ids).all()}
+    return (time.perf_counter() - start) / REPEAT * 1000, ids
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [2, 4, 6]
+    db = SessionLocal()
+    try:
+        all_ids = [c.id for c in db.query(models.Category.id).all()]
+        for n in sizes:
+            category_ids = random.sample(all_ids, min(n, len(all_ids)))
+            t_join, ids_join = measure(join_chain, db, category_ids)
+            t_group, ids_group = measure(group_having, db, category_ids)
+            assert ids_join == ids_group, "różne wyniki!"
+            print(f"N={n:2d}  join: {t_join:8.2f} ms   group/having: {t_group:8.2f} ms   "
+                  f"wyników: {len(ids_group)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
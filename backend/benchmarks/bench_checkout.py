@@ -0,0 +1,110 @@
+# benchmarks/bench_checkout.py
+"""
+Checkout koszyka: pętla po pozycjach (poprzednia wersja add_to_purchased –
+INSERT + DELETE na każde zdjęcie) vs. zbiorowy checkout_cart
+(INSERT ... SELECT, jeden UPDATE licznika, jeden DELETE).
+
+Tworzy --carts użytkowników z koszykami po --items zdjęć i robi checkout
+równolegle z tylu wątków. Każda transakcja kończy się ROLLBACK, więc
+baza po teście jest taka jak przed nim (poza usuniętymi kontami testowymi).
+
+Uruchomienie (z katalogu backend, przy działającej bazie z co najmniej
+--items zdjęciami):
+    python -m benchmarks.bench_checkout --carts 16 --items 100 --rounds 5
+"""
+import argparse
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from app.database import SessionLocal
+from app.utils.checkout import lock_cart, checkout_cart
+
+
+def row_by_row(db, user_id: int) -> int:
+    cart_id = lock_cart(db, user_id)
+    items = db.execute(text("""
+        SELECT p.id, p.price FROM cart_items ci JOIN photos p ON p.id = ci.photo_id
+        WHERE ci.cart_id = :cid
+    """), {"cid": cart_id}).all()
+    for photo_id, price in items:
+        db.execute(text("""
+            INSERT INTO purchases (user_id, photo_id, purchase_date, payment_status, total_cost, created_at)
+            VALUES (:user_id, :photo_id, NOW(), 'completed', :total_cost, NOW())
+        """), {"user_id": user_id, "photo_id": photo_id, "total_cost": price})
+        db.execute(text("UPDATE photos SET purchase_count = purchase_count + 1 WHERE id = :id"),
+                   {"id": photo_id})
+        db.execute(text("DELETE FROM cart_items WHERE cart_id = :cid AND photo_id = :pid"),
+                   {"cid": cart_id, "pid": photo_id})
+    return len(items)
+
+
+def set_based(db, user_id: int) -> int:
+    return checkout_cart(db, user_id, lock_cart(db, user_id))[0]
+
+
+def timed_checkout(variant, user_id: int) -> float:
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        variant(db, user_id)
+        elapsed = (time.perf_counter() - start) * 1000
+        db.rollback()
+        return elapsed
+    finally:
+        db.close()
+
+
+def create_carts(db, carts: int, items: int) -> list[int]:
+    photo_ids = [r[0] for r in db.execute(text("SELECT id FROM photos ORDER BY id LIMIT :n"), {"n": items})]
+    if len(photo_ids) < items:
+        raise SystemExit(f"Za mało zdjęć w bazie ({len(photo_ids)} < {items})")
+    user_ids = []
+    for _ in range(carts):
+        tag = uuid.uuid4().hex[:12]
+        user_id = db.execute(text("""
+            INSERT INTO users (email, username, hashed_password, role, banned, full_banned, is_active)
+            VALUES (:email, :name, '-', 'user', 0, 0, 1)
+        """), {"email": f"bench-{tag}@example.com", "name": f"bench-{tag}"}).lastrowid
+        cart_id = db.execute(text("INSERT INTO cart (user_id) VALUES (:uid)"), {"uid": user_id}).lastrowid
+        db.execute(text("INSERT INTO cart_items (cart_id, photo_id) VALUES (:cid, :pid)"),
+                   [{"cid": cart_id, "pid": pid} for pid in photo_ids])
+        user_ids.append(user_id)
+    db.commit()
+    return user_ids
+
+
+def run(variant, user_ids: list[int], rounds: int) -> tuple[list[float], float]:
+    latencies = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(user_ids)) as pool:
+        for _ in range(rounds):
+            latencies += pool.map(lambda uid: timed_checkout(variant, uid), user_ids)
+    return latencies, time.perf_counter() - start
+
+
+def main(args) -> None:
+    db = SessionLocal()
+    user_ids = create_carts(db, args.carts, args.items)
+    try:
+        for name, variant in (("pętla", row_by_row), ("zbiorowo", set_based)):
+            latencies, wall = run(variant, user_ids, args.rounds)
+            q = statistics.quantiles(latencies, n=100)
+            print(f"{name:>9}: {len(latencies) / wall:7.1f} checkoutów/s  "
+                  f"p50={q[49]:7.1f} ms  p95={q[94]:7.1f} ms")
+    finally:
+        for user_id in user_ids:
+            db.execute(text("CALL delete_user_and_related(:uid)"), {"uid": user_id})
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_checkout")
+    parser.add_argument("--carts", type=int, default=16, help="równoległe checkouty")
+    parser.add_argument("--items", type=int, default=100, help="pozycji w koszyku")
+    parser.add_argument("--rounds", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,79 @@
+# benchmarks/load_login.py
+"""
+Test obciążeniowy logowania: przepustowość POST /users/login przy N
+równoległych klientach oraz opóźnienie GET /photos/categories w tym czasie.
+
+bcrypt liczony w wątku requestu zjadał pulę wątków i GIL – p95 innych
+endpointów rosło razem z liczbą logowań. Z pulą procesów (utils/passwords.py)
+logowania ponad PASSWORD_QUEUE_LIMIT dostają 503 z Retry-After (klient
+czeka i ponawia), a reszta API zostaje płaska.
+
+Uruchomienie (z katalogu backend, przy działającym serwerze, wymaga httpx
+i aktywnego konta):
+    python -m benchmarks.load_login --email test@example.com --password haslo --clients 32
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def summary(name: str, latencies: list) -> str:
+    if not latencies:
+        return f"{name:>10}: brak pomiarów"
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return (f"{name:>10}: n={len(latencies):5d}  p50={q[49]:7.1f} ms  "
+            f"p95={q[94]:7.1f} ms  max={max(latencies):7.1f} ms")
+
+
+async def login_client(client: httpx.AsyncClient, creds: dict, deadline: float,
+                       latencies: list, counters: dict) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        r = await client.post("/users/login", json=creds)
+        if r.status_code == 503:
+            counters["rejected"] += 1
+            await asyncio.sleep(float(r.headers.get("Retry-After", "1")))
+            continue
+        r.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        counters["ok"] += 1
+
+
+async def other_probe(client: httpx.AsyncClient, deadline: float, latencies: list) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        r = await client.get("/photos/categories", headers={"Cache-Control": "no-cache"})
+        latencies.append((time.perf_counter() - start) * 1000)
+        r.raise_for_status()
+        await asyncio.sleep(0.02)
+
+
+async def main(args) -> None:
+    creds = {"email": args.email, "password": args.password}
+    counters = {"ok": 0, "rejected": 0}
+    logins: list = []
+    others: list = []
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60,
+                                 limits=httpx.Limits(max_connections=args.clients + 4)) as client:
+        deadline = time.perf_counter() + args.seconds
+        await asyncio.gather(
+            other_probe(client, deadline, others),
+            *(login_client(client, creds, deadline, logins, counters) for _ in range(args.clients)),
+        )
+    print(f"{'logowania':>10}: {counters['ok'] / args.seconds:7.1f} /s  "
+          f"odrzucone (503): {counters['rejected']}")
+    print(summary("login", logins))
+    print(summary("kategorie", others))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_login")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--clients", type=int, default=32, help="równoległe logowania")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,117 @@
+# benchmarks/load_upload_catalog.py
+"""
+Test obciążeniowy: opóźnienie GET /photos/ (katalog) w spoczynku i w trakcie
+równoległych uploadów kawałkami (upload-chunk) oraz wsadowych (upload).
+
+Przy zapisie plików w pętli zdarzeń p95 katalogu rośnie razem z liczbą
+uploadów; po przeniesieniu I/O do wątków (utils/aio.py) ma zostać płaskie –
+to właśnie ten test ma pokazać. Ścieżka uploadu używa SQL tylko dla MySQL
+(INSERT IGNORE, ON DUPLICATE KEY UPDATE, SKIP LOCKED), więc serwer musi
+działać na prawdziwej bazie; wyniki referencyjne nie są jeszcze zebrane.
+
+GET /photos/ ma cache odpowiedzi (utils/cache.py), którego klucz to
+ścieżka + wszystkie parametry. Każde żądanie sondy ma więc własny,
+nieużywany przez endpoint parametr probe=<n> – zawsze chybia cache
+i mierzy pełną ścieżkę (baza + serializacja), a nie trafienie w pamięci.
+
+Uruchomienie (z katalogu backend, przy działającym serwerze, wymaga httpx):
+    python -m benchmarks.load_upload_catalog --uploads 8 --size-mb 32
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import statistics
+import time
+
+import httpx
+
+from app.security import create_access_token
+
+CHUNK_SIZE = 1024 * 1024
+_probe_ids = itertools.count()
+
+
+async def catalog_probe(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list) -> None:
+    while not stop.is_set():
+        # probe=<n> – nowy klucz cache przy każdym żądaniu (endpoint go ignoruje)
+        params = {"limit": random.randint(20, 60), "probe": next(_probe_ids)}
+        start = time.perf_counter()
+        r = await client.get("/photos/", params=params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        r.raise_for_status()
+        await asyncio.sleep(0.02)
+
+
+async def chunked_upload(client: httpx.AsyncClient, size: int) -> None:
+    total_chunks = -(-size // CHUNK_SIZE)
+    r = await client.post("/photos/start-upload", data={
+        "total_chunks": total_chunks, "chunk_size": CHUNK_SIZE, "total_size": size,
+    })
+    r.raise_for_status()
+    upload_id = r.json()["upload_id"]
+    for index in range(total_chunks):
+        data = os.urandom(min(CHUNK_SIZE, size - index * CHUNK_SIZE))
+        r = await client.post("/photos/upload-chunk", data={
+            "upload_id": upload_id, "chunk_index": index,
+        }, files={"chunk": ("chunk", data, "application/octet-stream")})
+        r.raise_for_status()
+    r = await client.post("/photos/finish-upload", data={
+        "upload_id": upload_id, "title": "load-test", "description": "-", "category": "-",
+        "price": 0, "original_filename": "load.mp4",
+    })
+    r.raise_for_status()
+
+
+async def batch_upload(client: httpx.AsyncClient, size: int, files: int = 4) -> None:
+    r = await client.post("/photos/upload", data={
+        "titles": ["load-test"] * files, "descriptions": ["-"] * files, "price": 0,
+    }, files=[("files", (f"{i}.jpg", os.urandom(size // files), "image/jpeg")) for i in range(files)])
+    r.raise_for_status()
+
+
+def summary(name: str, latencies: list) -> str:
+    if not latencies:
+        return f"{name:>10}: brak pomiarów"
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return (f"{name:>10}: n={len(latencies):4d}  p50={q[49]:7.1f} ms  "
+            f"p95={q[94]:7.1f} ms  max={max(latencies):7.1f} ms")
+
+
+async def phase(client, seconds: float, uploads: int, size: int) -> list:
+    latencies: list = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(catalog_probe(client, stop, latencies))
+    if uploads:
+        jobs = [chunked_upload(client, size) if i % 2 == 0 else batch_upload(client, size)
+                for i in range(uploads)]
+        await asyncio.gather(*jobs)
+    else:
+        await asyncio.sleep(seconds)
+    stop.set()
+    await probe
+    return latencies
+
+
+async def main(args) -> None:
+    token = create_access_token({"sub": str(args.user_id)})
+    async with httpx.AsyncClient(
+        base_url=args.base_url, timeout=300,
+        headers={"Authorization": f"Bearer {token}"},
+        limits=httpx.Limits(max_connections=args.uploads * 2 + 4),
+    ) as client:
+        idle = await phase(client, args.idle_seconds, 0, 0)
+        busy = await phase(client, 0, args.uploads, args.size_mb * 1024 * 1024)
+    print(summary("spoczynek", idle))
+    print(summary("uploady", busy))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_upload_catalog")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--user-id", type=int, default=1, help="właściciel wgrywanych zdjęć")
+    parser.add_argument("--uploads", type=int, default=8, help="równoległe uploady")
+    parser.add_argument("--size-mb", type=int, default=32, help="rozmiar jednego uploadu")
+    parser.add_argument("--idle-seconds", type=float, default=5.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,36 @@
+# tests/test_routes.py
+"""
+Trasy zapytane przez pełną aplikację (app.main) – brakujący include_router
+kończy się 404 z domyślnym "Not Found" zamiast odpowiedzi handlera.
+
+Import app.main tworzy tabele i procedury, więc potrzebna jest baza
+z app/database.py (MySQL).
+"""
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import photos
+
+
+class EmptySession:
+    def get(self, model, ident):
+        return None
+
+    def close(self):
+        pass
+
+
+def empty_db():
+    yield EmptySession()
+
+
+def test_stream_routes_are_mounted():
+    app.dependency_overrides[photos.get_db] = empty_db
+    try:
+        client = TestClient(app)
+        for url in ("/photos/stream/1/hls", "/photos/stream/1"):
+            r = client.get(url, follow_redirects=False)
+            assert r.status_code == 404
+            assert r.json()["detail"] == "Zdjęcie nie znalezione"
+    finally:
+        app.dependency_overrides.clear()
@@ -1,7 +1,33 @@
 import { Photo } from "./types";
 
-export async function listPhotos(): Promise<Photo[]> {
-  const res = await fetch("http://127.0.0.1:8000/photos/");
+const API_URL = "http://127.0.0.1:8000";
+
+export type PhotoPage = {
+  photos: Photo[];
+  nextCursor: string | null;   // z nagłówka X-Next-Cursor; null = ostatnia strona
+};
+
+export async function listPhotosPage(
+  params: URLSearchParams = new URLSearchParams(),
+  cursor: string | null = null
+): Promise<PhotoPage> {
+  const query = new URLSearchParams(params);
+  if (cursor) query.set("cursor", cursor);
+  const res = await fetch(`${API_URL}/photos/?${query.toString()}`);
   if (!res.ok) throw new Error("Nie można pobrać galerii");
-  return res.json();
+  return { photos: await res.json(), nextCursor: res.headers.get("X-Next-Cursor") };
+}
+
+// Cała galeria – kolejne strony aż do braku X-Next-Cursor
+export async function listPhotos(
+  params: URLSearchParams = new URLSearchParams()
+): Promise<Photo[]> {
+  const all: Photo[] = [];
+  let cursor: string | null = null;
+  do {
+    const page: PhotoPage = await listPhotosPage(params, cursor);
+    all.push(...page.photos);
+    cursor = page.nextCursor;
+  } while (cursor);
+  return all;
 }
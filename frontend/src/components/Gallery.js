@@ -1,5 +1,5 @@
 //src/components/Gallery.js
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import { Link, useLocation, useNavigate } from "react-router-dom";
 const API_URL = process.env.REACT_APP_API_URL || "http://127.0.0.1:8000";
 
@@ -7,8 +7,12 @@ export default function Gallery() {
   const [photos, setPhotos] = useState([]);
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(true);
+  // kursor kolejnej strony z nagłówka X-Next-Cursor (null = ostatnia strona)
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const location = useLocation();
   const navigate = useNavigate();
+  const currentSearch = useRef(location.search);
 
   const queryParams = new URLSearchParams(location.search);
   const sort_by = queryParams.get("sort_by") || "";
@@ -24,16 +28,24 @@ export default function Gallery() {
       .catch((err) => console.error("Błąd ładowania kategorii:", err));
   }, []);
 
+  const fetchPage = (cursor) => {
+    const params = new URLSearchParams(location.search);
+    if (cursor) params.set("cursor", cursor);
+    return fetch(`${API_URL}/photos/?${params.toString()}`).then((r) => {
+      if (!r.ok) throw new Error("Błąd zapytania: " + r.status);
+      return r.json().then((data) => ({ data, next: r.headers.get("X-Next-Cursor") }));
+    });
+  };
+
   useEffect(() => {
+    currentSearch.current = location.search;
     setLoading(true);
-    const url = `${API_URL}/photos/?${queryParams.toString()}`;
-    fetch(url)
-      .then((r) => {
-        if (!r.ok) throw new Error("Błąd zapytania: " + r.status);
-        return r.json();
-      })
-      .then((data) => {
+    setNextCursor(null);
+    fetchPage(null)
+      .then(({ data, next }) => {
+        if (currentSearch.current !== location.search) return;
         setPhotos(data);
+        setNextCursor(next);
         setLoading(false);
       })
       .catch((err) => {
@@ -42,6 +54,20 @@ export default function Gallery() {
       });
   }, [location.search]);
 
+  const handleLoadMore = () => {
+    const search = location.search;
+    setLoadingMore(true);
+    fetchPage(nextCursor)
+      .then(({ data, next }) => {
+        // filtry zmieniły się w trakcie – ta strona należy do starej listy
+        if (currentSearch.current !== search) return;
+        setPhotos((prev) => [...prev, ...data]);
+        setNextCursor(next);
+      })
+      .catch((err) => console.error("Fetch error:", err))
+      .finally(() => setLoadingMore(false));
+  };
+
   const handleSortChange = (e) => {
     queryParams.set("sort_by", e.target.value);
     navigate(`/?${queryParams.toString()}`);
@@ -180,6 +206,18 @@ export default function Gallery() {
   </div>
 )}
 
+      {nextCursor && (
+        <div className="flex justify-center mt-6">
+          <button
+            onClick={handleLoadMore}
+            disabled={loadingMore}
+            className="bg-blue-600 text-white px-4 py-2 rounded hover:bg-blue-700 disabled:opacity-50"
+          >
+            {loadingMore ? "Ładowanie…" : "Załaduj więcej"}
+          </button>
+        </div>
+      )}
+
     </div>
   );
 }
\ No newline at end of file
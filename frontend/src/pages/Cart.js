@@ -4,7 +4,6 @@ import { Link } from "react-router-dom";
 const API_URL = process.env.REACT_APP_API_URL || "http://127.0.0.1:8000";
 
 function Cart() {
-  const [photoIds, setPhotoIds] = useState([]);
   const [photos, setPhotos] = useState([]);
   const [total, setTotal] = useState(0);
   const token = localStorage.getItem("access_token");
@@ -17,11 +16,13 @@ function Cart() {
   useEffect(() => {
     if (!token) return;
 
+    // hydrated=true – pełne dane zdjęć w jednym zapytaniu (bez osobnego /photos/batch)
     api
       .get(`${API_URL}/cart/`, {
+        params: { hydrated: true },
         headers: { Authorization: `Bearer ${token}` },
       })
-      .then((res) => setPhotoIds(res.data))
+      .then((res) => setPhotos(res.data))
       .catch((err) => console.error("Błąd ładowania koszyka:", err));
 
     api
@@ -32,37 +33,13 @@ function Cart() {
       .catch((err) => console.error("Błąd ładowania sumy koszyka:", err));
   }, []);
 
-  useEffect(() => {
-    const fetchPhotos = async () => {
-      const promises = photoIds.map((id) =>
-        api.get(`${API_URL}/photos/${id}`, {
-          headers: { Authorization: `Bearer ${token}` },
-        })
-      );
-      try {
-        const responses = await Promise.all(promises);
-        const loadedPhotos = responses.map((res) => res.data);
-        setPhotos(loadedPhotos);
-      } catch (err) {
-        console.error("Błąd ładowania zdjęć:", err);
-      }
-    };
-
-    if (photoIds.length > 0) {
-      fetchPhotos();
-    } else {
-      setPhotos([]);
-      setTotal(0);
-    }
-  }, [photoIds]);
-
   const handleRemove = (photoId) => {
     api
       .delete(`${API_URL}/cart/remove/${photoId}`, {
         headers: { Authorization: `Bearer ${token}` },
       })
       .then(() => {
-        setPhotoIds((prev) => prev.filter((id) => id !== photoId));
+        setPhotos((prev) => prev.filter((photo) => photo.id !== photoId));
 
         api
           .get(`${API_URL}/cart/sum`, {
@@ -95,7 +72,6 @@ function Cart() {
     .then((res) => {
       setMessageType("success");
       setMessage(res.data.message);
-      setPhotoIds([]);
       setPhotos([]);
       setTotal(0); 
     })
@@ -121,7 +97,6 @@ function Cart() {
       .then((res) => {
         setMessageType("success");
         setMessage(res.data.message);
-        setPhotoIds([]);
         setPhotos([]);
         setTotal(0);
         window.dispatchEvent(new CustomEvent("cartUpdated", { detail: 0 }));
@@ -27,25 +27,17 @@ function PurchasedPhotos() {
     }${path.replace(/\\/g, "/")}`;
   };
 
-  const downloadPhoto = async (photoId, fileName) => {
+  const downloadPhoto = async (photoId) => {
     try {
-      const response = await fetch(`${API_URL}/photos/download/${photoId}`, {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
+      // podpisany link – przeglądarka pobiera plik sama, bez buforowania w pamięci
+      const res = await api.get(`${API_URL}/photos/download/${photoId}/link`, {
+        headers: { Authorization: `Bearer ${token}` },
       });
-
-      if (!response.ok) throw new Error("Nie udało się pobrać pliku");
-
-      const blob = await response.blob();
-      const url = window.URL.createObjectURL(blob);
       const a = document.createElement("a");
-      a.href = url;
-      a.download = fileName || "plik";
+      a.href = res.data.url;
       document.body.appendChild(a);
       a.click();
       a.remove();
-      window.URL.revokeObjectURL(url);
     } catch (err) {
       console.error("Błąd pobierania pliku:", err);
     }
@@ -85,7 +77,7 @@ function PurchasedPhotos() {
                 <div className="p-2">
                   <h3 className="font-bold">{photo.title}</h3>
                   <button
-                    onClick={() => downloadPhoto(photo.id, photo.title)}
+                    onClick={() => downloadPhoto(photo.id)}
                     className="mt-2 w-full text-center bg-blue-600 text-white px-3 py-1 rounded text-sm hover:bg-blue-700 transition"
                   >
                     Pobierz